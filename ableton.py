@@ -1,11 +1,10 @@
 # --- ableton.py ---
 import logging
-from live import Set
-from pythonosc import udp_client
 import os
-import subprocess
 import time
-import psutil
+import threading
+import backends
+from config import OSC_LISTEN_PORT
 
 # Setup logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
@@ -25,18 +24,34 @@ class AbletonConnection:
             self.is_connected = False
             self.ableton_set = None
             self.osc_client = None
+            self.osc_server = None
+            # pylive's query() tracks one request at a time, so every call into the set goes through this lock
+            self.live_lock = threading.RLock()
             self.initialize_osc()
     
     def initialize_osc(self):
         """Initialize OSC client"""
         OSC_IP = "127.0.0.1"
         OSC_PORT = 8000
-        self.osc_client = udp_client.SimpleUDPClient(OSC_IP, OSC_PORT)
+        self.osc_client = backends.current().osc_client(OSC_IP, OSC_PORT)
         logging.info("OSC client initialized")
     
+    def start_osc_listener(self, handlers):
+        """
+        Starts receiving OSC messages from Max for Live in a daemon thread.
+
+        Args:
+            handlers (dict): Maps OSC addresses to handler(address, *args) callables.
+        """
+        if self.osc_server:
+            return
+        self.osc_server = backends.current().osc_server("127.0.0.1", OSC_LISTEN_PORT, handlers)
+        threading.Thread(target=self.osc_server.serve_forever, name="osc-listener", daemon=True).start()
+        logging.info(f"OSC listener started on port {OSC_LISTEN_PORT}")
+
     def is_ableton_running(self):
         """Check if Ableton Live is already running"""
-        return any('Live' in p.name() for p in psutil.process_iter(['name']))
+        return backends.current().is_live_running()
     
     def launch_set(self, set_path):
         """
@@ -65,7 +80,7 @@ class AbletonConnection:
             
         try:
             logging.info("Launching Ableton Live...")
-            subprocess.Popen(['open', set_path])
+            backends.current().launch_live(set_path)
             
             # Quick check for first 3 seconds
             for _ in range(5):
@@ -86,13 +101,25 @@ class AbletonConnection:
     def connect_to_set(self):
         """Initialize connection to Ableton Live set"""
         try:
-            self.ableton_set = Set(scan=True)
+            with self.live_lock:
+                self.ableton_set = backends.current().open_set()
             logging.info("Connected to Ableton Live set")
             return True
         except Exception as e:
             logging.error(f"Error connecting to Ableton Live set: {e}")
             return False
     
+    def get_tempo(self):
+        """Returns the tempo of the Live set in BPM, or None if it can't be read."""
+        if not self.ableton_set:
+            return None
+        try:
+            with self.live_lock:
+                return float(self.ableton_set.tempo)
+        except Exception as e:
+            logging.debug(f"Error reading tempo from Ableton Live: {e}")
+            return None
+
     def send_reset_osc(self):
         """Sends an OSC message to reset the playhead."""
         if self.osc_client:
@@ -107,43 +134,54 @@ class AbletonConnection:
         
         self.send_reset_osc()
         
-        try:
-            track = self.ableton_set.tracks[track_index]
-        except IndexError:
-            logging.error(f"Invalid track index: {track_index}")
-            return
-        
-        for t in self.ableton_set.tracks:
-            if t.solo:
-                t.solo = False
-        
-        track.solo = True
-        
-        if track.clips:
-            clip = track.clips[0]
-            if clip:
-                try:
-                    clip.play()
-                    logging.info(f"Playing: {track.name}")
-                except Exception as e:
-                    logging.error(f"Error playing clip on '{track.name}': {e}")
+        with self.live_lock:
+            try:
+                track = self.ableton_set.tracks[track_index]
+            except IndexError:
+                logging.error(f"Invalid track index: {track_index}")
+                return
+            
+            for t in self.ableton_set.tracks:
+                if t.solo:
+                    t.solo = False
+            
+            track.solo = True
+            
+            if track.clips:
+                clip = track.clips[0]
+                if clip:
+                    try:
+                        clip.play()
+                        logging.info(f"Playing: {track.name}")
+                    except Exception as e:
+                        logging.error(f"Error playing clip on '{track.name}': {e}")
     
-    def stop_all(self):
-        """Stops all playback in Ableton Live via OSC."""
+    def stop_all(self, cancelled=None):
+        """
+        Stops all playback in Ableton Live via OSC.
+
+        Args:
+            cancelled (callable, optional): Checked before each track; once it returns
+                True the remaining tracks are left alone (a newer switch stops them again).
+        """
         if self.osc_client:
             self.osc_client.send_message("/stop", 0)
             logging.info("Sent OSC stop command to Max for Live.")
 
         if self.ableton_set:
-            for track in self.ableton_set.tracks:
-                if not track.clips:
-                    continue
-                for clip in track.clips:
-                    if clip:
-                        try:
-                            clip.stop()
-                        except Exception as e:
-                            logging.error(f"Error stopping clip on '{track.name}': {e}")
+            with self.live_lock:
+                for track in self.ableton_set.tracks:
+                    if cancelled is not None and cancelled():
+                        logging.info("Stop cancelled by a newer request.")
+                        return
+                    if not track.clips:
+                        continue
+                    for clip in track.clips:
+                        if clip:
+                            try:
+                                clip.stop()
+                            except Exception as e:
+                                logging.error(f"Error stopping clip on '{track.name}': {e}")
             logging.info("All playback stopped.")
 
 # Add the set path as a constant
@@ -159,12 +197,15 @@ def launch_ableton_set(set_path):
 def play_track(track_index):
     return ableton.play_track(track_index)
 
-def stop_all():
-    return ableton.stop_all()
+def stop_all(cancelled=None):
+    return ableton.stop_all(cancelled)
 
 def send_reset_osc():
     return ableton.send_reset_osc()
 
+def get_tempo():
+    return ableton.get_tempo()
+
 class AbletonInterface:
     def __init__(self):
         self.artwork_path = "assets/artwork"  # Update from "artwork" if it exists
@@ -0,0 +1,215 @@
+# --- artpack.py ---
+
+import os
+import mmap
+import stat
+import zlib
+import struct
+import logging
+import argparse
+from PIL import Image
+from StreamDeck.ImageHelpers import PILHelper
+from backends import DECK_MODELS, DEFAULT_DECK_MODEL, FakeDeck
+from config import BASE_DIR, SONG_DB_PATH, FONT_PATH, DEFAULT_PATHS, load_json
+from utils import load_font, compose_song_key, render_pressed_key
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+
+# File layout (little endian):
+#   header: magic "LDKP", version u8, key width u16, key height u16, key image format 4s
+#           (e.g. "JPEG", "BMP" padded with NULs), entry count u32
+#   index:  per entry: song id length u8 + UTF-8 song id, fingerprint u32, offset u32, length u32
+#           (each song has its key under its id and the pressed variant under id + PRESSED_SUFFIX)
+#   data:   native key images back to back; offsets are from the start of the file
+MAGIC = b"LDKP"
+VERSION = 2
+HEADER = struct.Struct("<4sBHH4sI")
+ENTRY = struct.Struct("<III")
+PRESSED_SUFFIX = "\0pressed"
+
+PACKS_PATH = os.path.join(BASE_DIR, "assets", "packs")
+
+
+def pack_path(model):
+    """Returns the pack file for a deck model, e.g. assets/packs/stream-deck-neo.keypack."""
+    slug = "".join(c if c.isalnum() else "-" for c in model.lower().replace("+", "plus")).strip("-")
+    return os.path.join(PACKS_PATH, f"{slug}.keypack")
+
+
+def song_cache_key(song):
+    """Returns the key a song is cached and packed under (same as Controller's cache key)."""
+    return str(song.get("id", song.get("title", "unknown")))
+
+
+def _file_stamp(path):
+    """Returns "size:mtime" for a file, or "" if it is missing (or a directory, e.g. for an empty image path)."""
+    try:
+        info = os.stat(path)
+    except OSError:
+        return ""
+    if not stat.S_ISREG(info.st_mode):
+        return ""
+    return f"{info.st_size}:{info.st_mtime_ns}"
+
+
+def song_fingerprint(song):
+    """
+    Returns a checksum of everything baked into a song's key image: its title,
+    the artwork file (path, size and modification time; the default image's
+    when the artwork is missing) and the font file.
+    """
+    image = song.get("image", "")
+    artwork = _file_stamp(os.path.join(BASE_DIR, image)) or "default " + _file_stamp(
+        os.path.join(BASE_DIR, DEFAULT_PATHS["default_image"]))
+    return zlib.crc32(f"{song.get('title', '')}\0{image}\0{artwork}\0{_file_stamp(FONT_PATH)}".encode("utf-8"))
+
+
+def ingest(model=DEFAULT_DECK_MODEL, songs=None, output=None):
+    """
+    Renders every song's key for a deck model and writes them to one pack file.
+
+    Args:
+        model (str): Deck model from backends.DECK_MODELS.
+        songs (list, optional): Song entries; defaults to config/songs.json.
+        output (str, optional): Pack file to write; defaults to pack_path(model).
+
+    Returns:
+        str: Path of the written pack.
+    """
+    if songs is None:
+        songs = load_json(SONG_DB_PATH).get("songs", [])
+    output = output or pack_path(model)
+    deck = FakeDeck(model)  # Only used for its key image format
+    key_size = tuple(deck.key_image_format()["size"])
+    key_format = deck.key_image_format()["format"]
+    font = load_font(FONT_PATH, 14)
+
+    default_path = os.path.join(BASE_DIR, DEFAULT_PATHS["default_image"])
+    try:
+        default_icon = Image.open(default_path).convert("RGBA")
+    except FileNotFoundError:
+        logging.warning("Default image not found: %s, using black.", default_path)
+        default_icon = Image.new("RGBA", key_size, (0, 0, 0, 255))
+
+    entries = []
+    for song in songs:
+        image_path = os.path.join(BASE_DIR, song.get("image", ""))
+        try:
+            icon = Image.open(image_path).convert("RGBA")
+        except (FileNotFoundError, IsADirectoryError):
+            logging.warning("Image not found: %s, using default.", image_path)
+            icon = default_icon
+        image = compose_song_key(deck, icon, song.get("title", ""), font)
+        native_img = bytes(PILHelper.to_native_key_format(deck, image))
+        pressed_img = bytes(render_pressed_key(deck, image))
+        fingerprint = song_fingerprint(song)
+        entries.append((song_cache_key(song).encode("utf-8")[:255], fingerprint, native_img))
+        entries.append(((song_cache_key(song) + PRESSED_SUFFIX).encode("utf-8")[:255], fingerprint, pressed_img))
+
+    index_size = sum(1 + len(song_id) + ENTRY.size for song_id, _, _ in entries)
+    offset = HEADER.size + index_size
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    temp_output = output + ".tmp"
+    with open(temp_output, "wb") as file:
+        file.write(HEADER.pack(MAGIC, VERSION, key_size[0], key_size[1],
+                               key_format.encode("ascii"), len(entries)))
+        for song_id, fingerprint, native_img in entries:
+            file.write(bytes([len(song_id)]) + song_id)
+            file.write(ENTRY.pack(fingerprint, offset, len(native_img)))
+            offset += len(native_img)
+        for _, _, native_img in entries:
+            file.write(native_img)
+    os.replace(temp_output, output)
+    logging.info("Packed %d song keys and their pressed variants for %s into %s (%d bytes)",
+                 len(songs), model, output, offset)
+    return output
+
+
+class KeyImagePack:
+    """
+    Read-only view of a key image pack.
+
+    The file is memory-mapped and images are handed out as memoryviews into the
+    mapping, so nothing is decoded or copied when keys are loaded.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._map)
+        magic, version, width, height, key_format, count = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"Not a LiveDeck key image pack: {path}")
+        self.key_size = (width, height)
+        self.key_format = key_format.rstrip(b"\0").decode("ascii")
+        self.index = {}
+        offset = HEADER.size
+        for _ in range(count):
+            length = self._map[offset]
+            song_id = self._map[offset + 1:offset + 1 + length].decode("utf-8")
+            offset += 1 + length
+            self.index[song_id] = ENTRY.unpack_from(self._map, offset)
+            offset += ENTRY.size
+
+    @classmethod
+    def for_deck(cls, deck):
+        """
+        Opens the pack for a deck's model, or returns None if there is no usable pack.
+        """
+        path = pack_path(deck.deck_type())
+        if not os.path.exists(path):
+            return None
+        try:
+            pack = cls(path)
+        except (OSError, ValueError, struct.error) as e:
+            logging.warning("Ignoring key image pack %s: %s", path, e)
+            return None
+        # Models sharing a deck type can still differ in key format (BMP vs JPEG Originals)
+        key_size = tuple(deck.key_image_format()["size"])
+        key_format = deck.key_image_format()["format"]
+        if (pack.key_size, pack.key_format) != (key_size, key_format):
+            logging.warning("Key image pack %s is %s %s, deck keys are %s %s; ignoring it",
+                            path, pack.key_size, pack.key_format, key_size, key_format)
+            pack.close()
+            return None
+        return pack
+
+    def get(self, song):
+        """
+        Returns the packed native key image for a song, or None if it is missing or stale.
+        """
+        return self._get(song_cache_key(song), song)
+
+    def get_pressed(self, song):
+        """
+        Returns the packed pressed variant of a song's key, or None if it is missing or stale.
+        """
+        return self._get(song_cache_key(song) + PRESSED_SUFFIX, song)
+
+    def _get(self, key, song):
+        entry = self.index.get(key)
+        if entry is None:
+            return None
+        fingerprint, offset, length = entry
+        if fingerprint != song_fingerprint(song):
+            return None
+        return self._view[offset:offset + length]
+
+    def close(self):
+        """Unmaps the pack. Images returned by get() must no longer be in use."""
+        self._view.release()
+        self._map.close()
+        self._file.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pack pre-rendered song key images for a Stream Deck model")
+    parser.add_argument("--model", default=DEFAULT_DECK_MODEL, choices=list(DECK_MODELS),
+                        help=f"Deck model to render for (default: {DEFAULT_DECK_MODEL})")
+    parser.add_argument("--all", action="store_true", help="Build a pack for every known deck model")
+    args = parser.parse_args()
+
+    for deck_model in (DECK_MODELS if args.all else [args.model]):
+        ingest(deck_model)
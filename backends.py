@@ -0,0 +1,694 @@
+# --- backends.py ---
+
+import os
+import time
+import logging
+import threading
+import subprocess
+from collections import deque
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+
+# Image formats of the Stream Deck models we render for (mirrors python-elgato-streamdeck)
+# Keyed on the python-elgato-streamdeck DECK_TYPE that deck_type() reports
+DECK_MODELS = {
+    "Stream Deck Neo": {
+        "key_count": 10,  # 8 keys + 2 touch keys
+        "key_format": {"size": (96, 96), "format": "JPEG", "flip": (True, True), "rotation": 0},
+        "screen_format": {"size": (248, 58), "format": "JPEG", "flip": (True, True), "rotation": 0},
+    },
+    "Stream Deck Original": {  # MK.2 and the second-revision Original (the first revision takes BMP keys)
+        "key_count": 15,
+        "key_format": {"size": (72, 72), "format": "JPEG", "flip": (True, True), "rotation": 0},
+        "screen_format": None,
+    },
+    "Stream Deck XL": {
+        "key_count": 32,
+        "key_format": {"size": (96, 96), "format": "JPEG", "flip": (True, True), "rotation": 0},
+        "screen_format": None,
+    },
+    "Stream Deck +": {
+        "key_count": 8,
+        "key_format": {"size": (120, 120), "format": "JPEG", "flip": (False, False), "rotation": 0},
+        "screen_format": {"size": (800, 100), "format": "JPEG", "flip": (False, False), "rotation": 0},
+    },
+}
+DEFAULT_DECK_MODEL = "Stream Deck Neo"
+
+INPUT_QUEUE_SIZE = 4096  # Messages an input buffers between polls; the oldest are dropped beyond that
+
+
+def _open_rtmidi_port(rt, name):
+    """Opens the rtmidi port called `name`, or whose name starts with it (ALSA appends client:port)."""
+    port_names = rt.get_ports()
+    matches = [i for i, port_name in enumerate(port_names) if port_name == name]
+    matches += [i for i, port_name in enumerate(port_names) if port_name.startswith(name)]
+    if not matches:
+        raise IOError(f"Unknown MIDI port: {name}")
+    try:
+        rt.open_port(matches[0])
+    except RuntimeError as e:
+        raise IOError(*e.args) from e
+
+
+def _queue_arrival(port, item):
+    """Queues a message from an input callback, counting the oldest one when a full queue drops it."""
+    if len(port._pending) == INPUT_QUEUE_SIZE:
+        if not port.dropped:
+            logging.warning("MIDI input %s is not being polled fast enough; dropping the oldest messages",
+                            port.name)
+        port.dropped += 1
+    port._pending.append(item)
+
+
+class RawMidiInput:
+    """
+    An rtmidi input read as raw bytes.
+
+    mido parses every message into a Message on rtmidi's callback thread; this
+    callback only stamps the lists of ints rtmidi delivers with their arrival
+    time (time.perf_counter()) and queues them until they are polled.
+    """
+
+    def __init__(self, name):
+        import rtmidi
+        self.name = name
+        self._pending = deque(maxlen=INPUT_QUEUE_SIZE)
+        self.dropped = 0
+        self._rt = rtmidi.MidiIn()
+        self._rt.ignore_types(sysex=False, timing=False, active_sense=True)  # Same filtering as mido
+        _open_rtmidi_port(self._rt, name)
+        self._rt.set_callback(self._arrived)
+        self.closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        if not self.closed:
+            self._rt.cancel_callback()
+            self._rt.close_port()
+            self._rt.delete()
+            self.closed = True
+
+    def _arrived(self, event, data=None):
+        _queue_arrival(self, (time.perf_counter(), event[0]))
+
+    def iter_pending_bytes(self):
+        """Yields (arrival time, raw bytes) for every message received since the last call."""
+        while True:
+            try:
+                yield self._pending.popleft()
+            except IndexError:
+                return
+
+    def iter_pending(self):
+        """Yields mido Messages, with `time` set to their arrival time."""
+        import mido
+        for arrived, data in self.iter_pending_bytes():
+            msg = mido.Message.from_bytes(data)
+            msg.time = arrived
+            yield msg
+
+
+class MidoInput:
+    """
+    A mido input whose messages get their arrival time (time.perf_counter()) in
+    `time` as mido's callback receives them, rather than when they are polled.
+    """
+
+    def __init__(self, name):
+        import mido
+        self.name = name
+        self._pending = deque(maxlen=INPUT_QUEUE_SIZE)
+        self.dropped = 0
+        self._port = mido.open_input(name, callback=self._arrived)
+        self.closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        if not self.closed:
+            self._port.close()
+            self.closed = True
+
+    def _arrived(self, msg):
+        msg.time = time.perf_counter()
+        _queue_arrival(self, msg)
+
+    def iter_pending(self):
+        while True:
+            try:
+                yield self._pending.popleft()
+            except IndexError:
+                return
+
+    def iter_pending_bytes(self):
+        for msg in self.iter_pending():
+            yield msg.time, msg.bytes()
+
+
+class RawMidiOutput:
+    """
+    An rtmidi output that sends pre-encoded bytes with send_bytes(), and mido
+    Messages with send() like a mido port.
+    """
+
+    def __init__(self, name):
+        import rtmidi
+        self.name = name
+        self._rt = rtmidi.MidiOut()
+        _open_rtmidi_port(self._rt, name)
+        self._lock = threading.Lock()
+        self.closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        # Under the send lock: rtmidi segfaults if the port is used after delete()
+        with self._lock:
+            if not self.closed:
+                self.closed = True
+                self._rt.close_port()
+                self._rt.delete()
+
+    def send_bytes(self, data):
+        with self._lock:
+            if self.closed:
+                raise IOError(f"MIDI port {self.name} is closed")
+            self._rt.send_message(data)
+
+    def send(self, msg):
+        self.send_bytes(msg.bytes())
+
+
+class HardwareBackend:
+    """Talks to the real Stream Deck, MIDI ports, Ableton Live and OSC endpoint."""
+
+    name = "hardware"
+
+    def enumerate_decks(self):
+        from StreamDeck.DeviceManager import DeviceManager
+        return DeviceManager().enumerate()
+
+    def get_input_names(self):
+        import mido
+        return mido.get_input_names()
+
+    def get_output_names(self):
+        import mido
+        return mido.get_output_names()
+
+    def open_input(self, name):
+        return MidoInput(name)
+
+    def open_raw_input(self, name):
+        return RawMidiInput(name)
+
+    def open_output(self, name):
+        return RawMidiOutput(name)
+
+    def open_set(self):
+        from live import Set
+        return Set(scan=True)
+
+    def osc_client(self, ip, port):
+        from pythonosc import udp_client
+        return udp_client.SimpleUDPClient(ip, port)
+
+    def osc_server(self, ip, port, handlers):
+        from pythonosc import dispatcher, osc_server
+        osc_dispatcher = dispatcher.Dispatcher()
+        for address, handler in handlers.items():
+            osc_dispatcher.map(address, handler)
+        return osc_server.BlockingOSCUDPServer((ip, port), osc_dispatcher)
+
+    def is_live_running(self):
+        import psutil
+        return any('Live' in p.name() for p in psutil.process_iter(['name']))
+
+    def launch_live(self, set_path):
+        subprocess.Popen(['open', set_path])
+
+
+class FakeDeck:
+    """
+    In-process stand-in for a StreamDeck device.
+
+    Implements the parts of the python-elgato-streamdeck device API LiveDeck uses
+    and records every write with a timestamp. Key callbacks run synchronously in
+    the thread that calls press().
+    """
+
+    def __init__(self, model=DEFAULT_DECK_MODEL, serial="FAKE0001"):
+        spec = DECK_MODELS[model]
+        self.model = model
+        self.serial = serial
+        self.update_lock = threading.RLock()
+        self.key_images = {}
+        self.key_colors = {}
+        self.screen_image = None
+        self.brightness = None
+        self.write_count = 0
+        self.last_write_time = 0.0
+        self.writes = deque(maxlen=1000)  # (perf_counter time, key or None for the screen)
+        self._spec = spec
+        self._open = False
+        self._connected = True
+        self._callback = None
+        self._written = threading.Condition()
+
+    def __enter__(self):
+        self.update_lock.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.update_lock.release()
+
+    def deck_type(self):
+        return self.model
+
+    def id(self):
+        return f"fake:{self.serial}"
+
+    def get_serial_number(self):
+        return self.serial
+
+    def key_count(self):
+        return self._spec["key_count"]
+
+    def is_visual(self):
+        return True
+
+    def key_image_format(self):
+        return dict(self._spec["key_format"])
+
+    def screen_image_format(self):
+        return dict(self._spec["screen_format"] or {})
+
+    def open(self):
+        self._check_connected()
+        self._open = True
+
+    def close(self):
+        self._open = False
+
+    def is_open(self):
+        return self._open
+
+    def connected(self):
+        return self._connected
+
+    def disconnect(self):
+        """Simulates the USB cable being pulled."""
+        self._connected = False
+        self._open = False
+
+    def reset(self):
+        self._check_connected()
+        self.key_images.clear()
+        self.key_colors.clear()
+        self.screen_image = None
+
+    def set_brightness(self, percent):
+        self._check_connected()
+        self.brightness = percent
+
+    def set_key_callback(self, callback):
+        self._callback = callback
+
+    def set_key_image(self, key, image):
+        self._check_connected()
+        self.key_images[key] = image
+        self.key_colors.pop(key, None)
+        self._record_write(key)
+
+    def set_key_color(self, key, r, g, b):
+        self._check_connected()
+        self.key_colors[key] = (r, g, b)
+        self._record_write(key)
+
+    def set_screen_image(self, image):
+        self._check_connected()
+        self.screen_image = image
+        self._record_write(None)
+
+    def press(self, key):
+        """Simulates a key down followed by a key up."""
+        if self._callback:
+            self._callback(self, key, True)
+            self._callback(self, key, False)
+
+    def wait_until_idle(self, quiet=0.05, timeout=5.0):
+        """
+        Blocks until no writes have happened for `quiet` seconds.
+
+        Returns:
+            float: perf_counter time of the last write.
+        """
+        deadline = time.perf_counter() + timeout
+        with self._written:
+            while time.perf_counter() < deadline:
+                since_last = time.perf_counter() - self.last_write_time
+                if since_last >= quiet:
+                    break
+                self._written.wait(quiet - since_last)
+        return self.last_write_time
+
+    def _record_write(self, key):
+        with self._written:
+            self.write_count += 1
+            self.last_write_time = time.perf_counter()
+            self.writes.append((self.last_write_time, key))
+            self._written.notify_all()
+
+    def _check_connected(self):
+        if not self._connected:
+            raise IOError(f"{self.model} ({self.serial}) is disconnected")
+
+
+class FakePort:
+    """
+    In-process stand-in for a mido input/output port.
+
+    Messages injected with inject() are returned by iter_pending()/receive(),
+    or as (arrival time, raw bytes) by iter_pending_bytes(); either mido
+    Messages or raw bytes may be injected, and are stamped with the time they
+    were injected. Whatever is passed to send() or send_bytes() is kept in
+    `sent` as (perf_counter time, message or bytes).
+    """
+
+    def __init__(self, name, history=10000):
+        self.name = name
+        self.closed = False
+        self.sent = deque(maxlen=history)
+        self.on_send = None  # Optional callback(message), called from send()
+        self._inbox = deque()
+        self._received = threading.Condition()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        self.closed = True
+
+    def inject(self, msg, timestamp=None):
+        """Queues a message as if it had arrived from the device at `timestamp` (default: now)."""
+        with self._received:
+            self._inbox.append((time.perf_counter() if timestamp is None else timestamp, msg))
+            self._received.notify()
+
+    def iter_pending(self):
+        """Yields mido Messages, with `time` set to their arrival time."""
+        while True:
+            msg = self.poll()
+            if msg is None:
+                return
+            yield msg
+
+    def iter_pending_bytes(self):
+        """Yields (arrival time, raw bytes) for every pending message."""
+        while True:
+            try:
+                arrived, data = self._inbox.popleft()
+            except IndexError:
+                return
+            yield arrived, data if isinstance(data, (bytes, bytearray, list)) else data.bytes()
+
+    def poll(self):
+        import mido
+        try:
+            arrived, msg = self._inbox.popleft()
+        except IndexError:
+            return None
+        if isinstance(msg, (bytes, bytearray, list)):
+            msg = mido.Message.from_bytes(msg)
+        msg.time = arrived
+        return msg
+
+    def receive(self, block=True):
+        with self._received:
+            while block and not self._inbox:
+                self._received.wait()
+        return self.poll()
+
+    def send(self, msg):
+        if self.closed:
+            raise IOError(f"MIDI port {self.name} is closed")
+        self.sent.append((time.perf_counter(), msg))
+        if self.on_send:
+            self.on_send(msg)
+
+    send_bytes = send
+
+
+class FakeClip:
+    def __init__(self, live, name):
+        self.live = live
+        self.name = name
+        self.is_playing = False
+
+    def play(self):
+        self.live.round_trip()
+        self.is_playing = True
+
+    def stop(self):
+        self.live.round_trip()
+        self.is_playing = False
+
+
+class FakeTrack:
+    def __init__(self, live, name, clip_count=1):
+        self.live = live
+        self.name = name
+        self._solo = False
+        self.clips = [FakeClip(live, f"{name} clip {i}") for i in range(clip_count)]
+
+    @property
+    def solo(self):
+        self.live.round_trip()
+        return self._solo
+
+    @solo.setter
+    def solo(self, value):
+        self.live.round_trip()
+        self._solo = value
+
+
+class FakeSet:
+    """Stand-in for a pylive Set; every property access costs one simulated OSC round trip."""
+
+    def __init__(self, track_count=16, call_latency=0.0, tempo=120.0):
+        self.call_latency = call_latency
+        self.calls = 0
+        self._tempo = tempo
+        self.tracks = [FakeTrack(self, f"Track {i + 1}") for i in range(track_count)]
+
+    def round_trip(self):
+        self.calls += 1
+        if self.call_latency:
+            time.sleep(self.call_latency)
+
+    @property
+    def tempo(self):
+        self.round_trip()
+        return self._tempo
+
+    @tempo.setter
+    def tempo(self, value):
+        self.round_trip()
+        self._tempo = value
+
+
+class FakeOSCClient:
+    """Stand-in for pythonosc's SimpleUDPClient that records (perf_counter time, address, value)."""
+
+    def __init__(self, ip, port, history=10000):
+        self.address = (ip, port)
+        self.sent = deque(maxlen=history)
+        self._sent_cond = threading.Condition()
+
+    def send_message(self, address, value):
+        with self._sent_cond:
+            self.sent.append((time.perf_counter(), address, value))
+            self._sent_cond.notify_all()
+
+    def wait_for(self, address, after, timeout=5.0):
+        """
+        Waits for a message to `address` sent after perf_counter time `after`.
+
+        Returns:
+            float: Send time of the message, or None on timeout.
+        """
+        deadline = time.perf_counter() + timeout
+        with self._sent_cond:
+            while True:
+                for sent_at, sent_address, _ in reversed(self.sent):
+                    if sent_at < after:
+                        break
+                    if sent_address == address:
+                        return sent_at
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    return None
+                self._sent_cond.wait(remaining)
+
+
+class FakeOSCServer:
+    """Stand-in for a pythonosc server; receive() dispatches a message to its handler directly."""
+
+    def __init__(self, ip, port, handlers):
+        self.server_address = (ip, port)
+        self.handlers = dict(handlers)
+        self._shutdown = threading.Event()
+
+    def receive(self, address, *args):
+        handler = self.handlers.get(address)
+        if handler:
+            handler(address, *args)
+
+    def serve_forever(self):
+        self._shutdown.wait()
+
+    def shutdown(self):
+        self._shutdown.set()
+
+
+class FakeBackend:
+    """
+    In-process fakes for the deck, MIDI ports, Live set and OSC client.
+
+    The fake objects are created once and shared, so a benchmark or test can
+    reach the same instances the application is using.
+    """
+
+    name = "fake"
+
+    def __init__(self, deck_model=DEFAULT_DECK_MODEL, live_latency=0.0,
+                 input_names=("Akai MPK88 Port 1", "IAC Driver Bus 1"),
+                 output_names=("IAC Driver Bus 2",)):
+        self.decks = [FakeDeck(deck_model)]
+        self.inputs = {name: FakePort(name) for name in input_names}
+        self.outputs = {name: FakePort(name) for name in output_names}
+        self.live_set = FakeSet(call_latency=live_latency)
+        self.osc_clients = []
+        self.osc_servers = []
+        self.live_running = True
+
+    def enumerate_decks(self):
+        return [deck for deck in self.decks if deck.connected()]
+
+    def get_input_names(self):
+        return list(self.inputs)
+
+    def get_output_names(self):
+        return list(self.outputs)
+
+    def open_input(self, name):
+        if name not in self.inputs:
+            raise IOError(f"Unknown MIDI input port: {name}")
+        port = self.inputs[name]
+        port.closed = False
+        return port
+
+    open_raw_input = open_input
+
+    def open_output(self, name):
+        if name not in self.outputs:
+            raise IOError(f"Unknown MIDI output port: {name}")
+        port = self.outputs[name]
+        port.closed = False
+        return port
+
+    def open_set(self):
+        return self.live_set
+
+    def osc_client(self, ip, port):
+        client = FakeOSCClient(ip, port)
+        self.osc_clients.append(client)
+        return client
+
+    def unplug_deck(self):
+        """Disconnects the fake deck."""
+        for deck in self.decks:
+            deck.disconnect()
+
+    def plug_deck(self):
+        """Connects a fresh device with the same model and serial, as re-enumeration would."""
+        old = self.decks[0]
+        self.decks = [FakeDeck(old.model, old.serial)]
+        return self.decks[0]
+
+    def remove_port(self, name):
+        """Makes a MIDI input or output port disappear."""
+        port = self.inputs.pop(name, None) or self.outputs.pop(name, None)
+        if port:
+            port.close()
+
+    def add_port(self, name, output=False):
+        """Makes a (new) MIDI input or output port appear."""
+        ports = self.outputs if output else self.inputs
+        ports[name] = FakePort(name)
+        return ports[name]
+
+    def osc_server(self, ip, port, handlers):
+        server = FakeOSCServer(ip, port, handlers)
+        self.osc_servers.append(server)
+        return server
+
+    def is_live_running(self):
+        return self.live_running
+
+    def launch_live(self, set_path):
+        self.live_running = True
+
+
+BACKENDS = {
+    "hardware": HardwareBackend,
+    "fake": FakeBackend,
+}
+
+_current = None
+
+
+def use(backend, **kwargs):
+    """
+    Selects the backend used by LiveDeck. Must be called before the application
+    modules (midi, ableton, main) are imported, as they open ports on import.
+
+    Args:
+        backend: A backend name from BACKENDS or a backend instance.
+        **kwargs: Passed to the backend constructor when a name is given.
+
+    Returns:
+        The active backend instance.
+    """
+    global _current
+    if isinstance(backend, str):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown backend: {backend}")
+        backend = BACKENDS[backend](**kwargs)
+    _current = backend
+    logging.info("Using %s backend", backend.name)
+    return backend
+
+
+def current():
+    """Returns the active backend, defaulting to $LIVEDECK_BACKEND or hardware."""
+    if _current is None:
+        use(os.environ.get("LIVEDECK_BACKEND", "hardware"))
+    return _current
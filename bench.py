@@ -0,0 +1,731 @@
+#!/usr/bin/env python3
+
+# --- bench.py ---
+
+import os
+import sys
+import json
+import time
+import random
+import logging
+import argparse
+import platform
+import subprocess
+import backends
+from utils import percentile
+
+BASE_DIR = os.path.abspath(os.path.dirname(__file__))
+BENCH_RESULTS_PATH = os.path.join(BASE_DIR, "bench_results")
+
+# Set by the command line before any application module is imported
+args = None
+backend = None
+_app = None
+
+
+def summarize(samples):
+    """
+    Summarises latency samples given in seconds.
+
+    Returns:
+        dict: Sample count and p50/p99/max/mean in milliseconds.
+    """
+    return {
+        "n": len(samples),
+        "p50_ms": percentile(samples, 50) * 1000,
+        "p99_ms": percentile(samples, 99) * 1000,
+        "max_ms": max(samples, default=0.0) * 1000,
+        "mean_ms": (sum(samples) / len(samples) * 1000) if samples else 0.0,
+    }
+
+
+def get_app():
+    """Starts LiveDeck once against the fake backend and returns (controller, deck)."""
+    global _app
+    if _app is None:
+        import main
+        _app = main.start(record_midi=False, show=False, router_process=False)
+        if _app is None:
+            raise RuntimeError("LiveDeck failed to start against the fake backend")
+    return _app
+
+
+def show_page(controller, deck, page):
+    controller.intents.submit_page(deck, page)
+    settle(controller, deck)
+
+
+def settle(controller, deck):
+    """Waits for queued key presses to be applied and the deck to go quiet."""
+    controller.intents.wait_idle()
+    deck.wait_until_idle()
+
+
+def bench_startup():
+    """Time from interpreter start to a fully initialized LiveDeck, in fresh processes."""
+    imports, starts, totals = [], [], []
+    for _ in range(args.startup_runs):
+        child = subprocess.run(
+            [sys.executable, __file__, "--startup-child", "--live-latency", str(args.live_latency)],
+            capture_output=True, text=True, check=True, cwd=BASE_DIR
+        )
+        result = json.loads(child.stdout.strip().splitlines()[-1])
+        imports.append(result["import_s"])
+        starts.append(result["start_s"])
+        totals.append(result["import_s"] + result["start_s"])
+    return {
+        "import": summarize(imports),
+        "start": summarize(starts),
+        "total": summarize(totals),
+    }
+
+
+def startup_child():
+    """Runs inside the child process spawned by bench_startup."""
+    began = time.perf_counter()
+    import main
+    imported = time.perf_counter()
+    if main.start(record_midi=False) is None:
+        sys.exit(1)
+    started = time.perf_counter()
+    print(json.dumps({"import_s": imported - began, "start_s": started - imported}))
+
+
+def bench_press_to_osc():
+    """Key-down on a song key to the play command leaving for Live."""
+    from controller import Controller
+    controller, deck = get_app()
+    osc = backend.osc_clients[0]
+    show_page(controller, deck, 0)
+    song_keys = min(Controller.SONGS_PER_PAGE, len(controller.song_data))
+    latencies = []
+    for i in range(args.presses):
+        pressed = time.perf_counter()
+        deck.press(i % song_keys)
+        sent = osc.wait_for("/reset", pressed)
+        if sent is not None:
+            latencies.append(sent - pressed)
+        settle(controller, deck)
+    return summarize(latencies)
+
+
+def bench_page_flip():
+    """Key-down on a navigation key to the last key image of the new page."""
+    from controller import Controller
+    controller, deck = get_app()
+    show_page(controller, deck, 0)
+    total_pages = (len(controller.song_data) + Controller.SONGS_PER_PAGE - 1) // Controller.SONGS_PER_PAGE
+    if total_pages < 2:
+        return {"skipped": "only one page of songs"}
+    latencies = []
+    for _ in range(args.presses):
+        key = Controller.NAV_FORWARD_INDEX if controller.current_page < total_pages - 1 else Controller.NAV_BACK_INDEX
+        pressed = time.perf_counter()
+        deck.press(key)
+        settle(controller, deck)
+        key_writes = [t for t, written_key in list(deck.writes) if t >= pressed and written_key is not None]
+        if key_writes:
+            latencies.append(max(key_writes) - pressed)
+    return summarize(latencies)
+
+
+def bench_key_mash():
+    """Bursts of rapid presses: how much work reaches the deck and Live."""
+    from controller import Controller
+    controller, deck = get_app()
+    osc = backend.osc_clients[0]
+    live = backend.live_set
+    results = {}
+
+    show_page(controller, deck, 0)
+    writes_before = deck.write_count
+    pressed = time.perf_counter()
+    for _ in range(5):
+        deck.press(Controller.NAV_FORWARD_INDEX)
+    settle(controller, deck)
+    results["nav_forward_x5"] = {
+        "final_page": controller.current_page,
+        "deck_writes": deck.write_count - writes_before,
+        "settle_ms": (deck.last_write_time - pressed) * 1000,
+    }
+
+    show_page(controller, deck, 0)
+    calls_before = live.calls
+    pressed = time.perf_counter()
+    for i in range(6):
+        deck.press(i % 2)
+    settle(controller, deck)
+    results["song_keys_x6"] = {
+        "live_round_trips": live.calls - calls_before,
+        "play_commands": sum(1 for t, address, _ in list(osc.sent) if t >= pressed and address == "/reset"),
+        "playing_song_index": controller.playing_song_index,
+    }
+
+    # A second press 20 ms later lands while the first switch is already talking to Live
+    show_page(controller, deck, 0)
+    calls_before = live.calls
+    deck.press(0)
+    settle(controller, deck)
+    single = live.calls - calls_before
+    calls_before = live.calls
+    deck.press(1)
+    time.sleep(0.02)
+    deck.press(0)
+    settle(controller, deck)
+    results["song_keys_20ms_apart"] = {
+        "live_round_trips": live.calls - calls_before,
+        "single_press_round_trips": single,
+        "playing_song_index": controller.playing_song_index,
+    }
+    results["coalesced_total"] = controller.intents.coalesced
+    return results
+
+
+def bench_render_throughput():
+    """Cold and warm (icon cache kept) rendering of every song key."""
+    from controller import Controller
+    controller, deck = get_app()
+    songs = len(controller.song_data)
+    results = {}
+    for mode in ("cold", "warm"):
+        elapsed = 0.0
+        for _ in range(args.render_runs):
+            Controller.button_image_cache.clear()
+            if mode == "cold":
+                Controller.icon_cache.clear()
+            started = time.perf_counter()
+            controller.pre_render_all_buttons(deck)
+            elapsed += time.perf_counter() - started
+        rendered = songs * args.render_runs
+        results[mode] = {
+            "keys": rendered,
+            "keys_per_s": rendered / elapsed if elapsed else 0.0,
+            "ms_per_key": elapsed / rendered * 1000 if rendered else 0.0,
+        }
+    return results
+
+
+def midi_traffic():
+    """
+    Yields (delay before the message, input port index, raw bytes).
+
+    Replays --recording at --replay-speed if given, otherwise synthesises notes
+    with random gaps of up to 10 ms.
+    """
+    if args.recording:
+        from recorder import iter_recording
+        previous = 0.0
+        for timestamp, port_index, data in iter_recording(args.recording):
+            yield (timestamp - previous) / args.replay_speed, port_index, data
+            previous = timestamp
+        return
+    for i in range(args.midi_messages):
+        note = 36 + i % 48
+        yield random.uniform(0, 0.01), i % 2, bytes([0x90, note, 100])
+
+
+def sent_bytes(item):
+    """Raw bytes of something sent to a fake output port, a mido Message or raw bytes."""
+    return bytes(item.bytes()) if hasattr(item, "bytes") else bytes(item)
+
+
+def measure_forwarding(inports, outport):
+    """Injects midi_traffic() into fake input ports and times each message until it is sent on outport."""
+    import mido
+    import midi
+    injected = {}
+    latencies = []
+
+    def on_send(msg):
+        sent = time.perf_counter()
+        started = injected.pop(id(msg), None)
+        if started is not None:
+            latencies.append(sent - started)
+
+    outport.on_send = on_send
+    try:
+        count = 0
+        for delay, port_index, data in midi_traffic():
+            if delay > 0:
+                time.sleep(delay)
+            # The raw path forwards the very object it read, so it can be matched up on send
+            msg = data if midi.RAW_MIDI_INPUT else mido.Message.from_bytes(data)
+            injected[id(msg)] = time.perf_counter()
+            inports[port_index % len(inports)].inject(msg)
+            count += 1
+        # Let the router drain; filtered messages never arrive and are dropped here
+        deadline = time.perf_counter() + 1.0
+        while injected and time.perf_counter() < deadline:
+            time.sleep(0.01)
+    finally:
+        outport.on_send = None
+    result = summarize(latencies)
+    result["injected"] = count
+    return result
+
+
+def bench_midi_forward():
+    """Message arriving on an input port to it being sent on the output port."""
+    import midi
+    get_app()
+    inports = [backend.inputs[name] for name in midi.midi_inputs]
+    return measure_forwarding(inports, backend.outputs[midi.midi_output_name])
+
+
+def bench_midi_router():
+    """
+    Forwarding latency with the router as a thread and as a separate process,
+    each while idle and while the app re-renders every key in a loop.
+    Both poll their ports at the router process's interval.
+    """
+    import threading
+    import midi
+    from router import MidiRouterProcess, ROUTER_POLL_INTERVAL
+    from controller import Controller
+    from StreamDeck.ImageHelpers import PILHelper
+    controller, deck = get_app()
+    inports = [backend.inputs[name] for name in midi.midi_inputs]
+    outport = backend.outputs[midi.midi_output_name]
+    child_results = os.path.join(BENCH_RESULTS_PATH, "router-child.json")
+    stop = threading.Event()
+
+    def rerender():
+        while not stop.is_set():
+            Controller.icon_cache.clear()
+            for song in controller.song_data:
+                PILHelper.to_native_key_format(deck, controller.compose_button(deck, song))
+
+    results = {}
+    saved_poll_interval = midi.POLL_INTERVAL
+    midi.POLL_INTERVAL = ROUTER_POLL_INTERVAL
+    time.sleep(saved_poll_interval)  # Let the forwarding thread finish its current, longer wait
+    try:
+        for mode in ("thread", "process"):
+            for load in ("idle", "rerender"):
+                stop.clear()
+                renderer = threading.Thread(target=rerender, name="bench-rerender", daemon=True)
+                if load == "rerender":
+                    renderer.start()
+                try:
+                    if mode == "thread":
+                        results[f"{mode}_{load}"] = measure_forwarding(inports, outport)
+                        continue
+                    if os.path.exists(child_results):
+                        os.remove(child_results)
+                    router = MidiRouterProcess(command=[
+                        sys.executable, __file__, "--midi-messages", str(args.midi_messages),
+                        *(["--recording", args.recording, "--replay-speed", str(args.replay_speed)]
+                          if args.recording else []),
+                        "--router-child",
+                    ])
+                    router.start()
+                    try:
+                        deadline = time.perf_counter() + 120
+                        while not os.path.exists(child_results) and router.running():
+                            if time.perf_counter() > deadline:
+                                raise RuntimeError("Router child produced no results")
+                            time.sleep(0.05)
+                        stats = router.stats()
+                    finally:
+                        router.stop()
+                    with open(child_results) as file:
+                        results[f"{mode}_{load}"] = json.load(file)
+                    results[f"{mode}_{load}"]["router_forwarded"] = stats["forwarded"]
+                finally:
+                    stop.set()
+                    if renderer.is_alive():
+                        renderer.join()
+    finally:
+        midi.POLL_INTERVAL = saved_poll_interval
+    return results
+
+
+def router_child(router_args):
+    """Runs inside the router process spawned by bench_midi_router: feeds traffic, times it, routes it."""
+    import threading
+    import midi
+    import router
+
+    def feed():
+        time.sleep(0.2)  # Let the router open its ports
+        inports = [backend.inputs[name] for name in midi.midi_inputs]
+        result = measure_forwarding(inports, backend.outputs[midi.midi_output_name])
+        path = os.path.join(BENCH_RESULTS_PATH, "router-child.json")
+        with open(path + ".tmp", "w") as file:
+            json.dump(result, file)
+        os.replace(path + ".tmp", path)
+
+    threading.Thread(target=feed, name="bench-feed", daemon=True).start()
+    router.main(router_args)
+
+
+def bench_midi_throughput():
+    """
+    Messages per second through the router's mido and raw-bytes input paths,
+    for a dense mix of notes, aftertouch, CCs and pitch bend. Per-message log
+    lines are disabled for both so that only reading, filtering and sending count.
+    """
+    from backends import FakePort
+    import midi
+
+    class Output:
+        # Does what an rtmidi output does before handing the message over
+        def send(self, msg):
+            msg.bytes()
+
+        def send_bytes(self, data):
+            pass
+
+    stream = []
+    for i in range(args.throughput_messages):
+        note = 12 + i % 112  # Partly outside the listen range
+        kind = i % 6
+        if kind == 0:
+            stream.append([0x90, note, 100])
+        elif kind == 1:
+            stream.append([0x80, note, 0])
+        elif kind == 2:
+            stream.append([0xA0, note, i % 128])      # Polyphonic aftertouch
+        elif kind == 3:
+            stream.append([0xB0, 1, i % 128])         # Mod wheel
+        elif kind == 4:
+            stream.append([0xD0, i % 128])            # Channel pressure
+        else:
+            stream.append([0xE0, i % 128, 64])        # Pitch bend
+
+    inport = FakePort("throughput")
+    saved_outport, saved_recorder = midi.outport, midi.recorder
+    root = logging.getLogger()
+    saved_level = root.level
+    midi.outport, midi.recorder = Output(), None
+    root.setLevel(logging.WARNING)
+    results = {}
+    try:
+        for path, poll in (("mido", midi.poll_messages), ("raw", midi.poll_bytes)):
+            best = None
+            for _ in range(args.throughput_runs):
+                for data in stream:
+                    inport.inject(data)
+                started = time.perf_counter()
+                poll(0, inport)
+                elapsed = time.perf_counter() - started
+                best = elapsed if best is None else min(best, elapsed)
+            results[path] = {
+                "messages": len(stream),
+                "msgs_per_s": len(stream) / best,
+                "us_per_msg": best / len(stream) * 1e6,
+            }
+    finally:
+        midi.outport, midi.recorder = saved_outport, saved_recorder
+        root.setLevel(saved_level)
+    results["speedup"] = results["raw"]["msgs_per_s"] / results["mido"]["msgs_per_s"]
+    return results
+
+
+def bench_midi_clock_jitter():
+    """Inter-tick error of the MIDI clock with every core loaded."""
+    from midi_clock import measure_jitter
+    return measure_jitter(duration=args.jitter_duration)
+
+
+def bench_playhead_progress():
+    """CPU and wall time per progress frame while Live streams playhead positions at 100 Hz."""
+    controller, deck = get_app()
+    progress = controller.playhead_progress
+    osc_server = backend.osc_servers[0]
+    show_page(controller, deck, 0)
+    deck.press(0)
+    settle(controller, deck)
+    progress.reset_stats()
+    length = 240.0
+    started = time.perf_counter()
+    while time.perf_counter() - started < args.progress_duration:
+        # Move ~1 px per message so nearly every frame has a new strip to draw
+        position = (time.perf_counter() - started) * 100 / 96 * length % length
+        osc_server.receive("/playhead", position, length)
+        time.sleep(0.01)
+    return progress.stats()
+
+
+def bench_hotplug():
+    """Time from a device coming back to LiveDeck using it again (budget: 1 s)."""
+    import mido
+    import midi
+    controller, deck = get_app()
+    settle(controller, deck)
+    results = {}
+
+    backend.unplug_deck()
+    time.sleep(0.5)
+    returned = time.perf_counter()
+    device = backend.plug_deck()
+    deadline = returned + 5.0
+    # Compared with the handle's current framebuffer: the progress strip keeps updating it while unplugged
+    while time.perf_counter() < deadline and not (deck.attached and device.key_images == deck.key_images):
+        time.sleep(0.005)
+    results["deck_recover_ms"] = (time.perf_counter() - returned) * 1000
+    results["deck_restored_keys"] = len(device.key_images)
+
+    name = midi.midi_inputs[0]
+    backend.remove_port(name)
+    time.sleep(0.5)
+    returned = time.perf_counter()
+    inport = backend.add_port(name)
+    outport = backend.outputs[midi.midi_output_name]
+    inport.inject(mido.Message("note_on", note=60, velocity=1))
+    deadline = returned + 5.0
+    while time.perf_counter() < deadline and not any(
+            sent_bytes(msg) == bytes([0x90, 60, 1]) for t, msg in list(outport.sent) if t >= returned):
+        time.sleep(0.005)
+    results["midi_input_recover_ms"] = (time.perf_counter() - returned) * 1000
+
+    backend.remove_port(midi.midi_output_name)
+    time.sleep(0.5)
+    returned = time.perf_counter()
+    new_outport = backend.add_port(midi.midi_output_name, output=True)
+    deadline = returned + 5.0
+    while time.perf_counter() < deadline and not (midi.outport is new_outport and controller.outport is new_outport):
+        time.sleep(0.005)
+    results["midi_output_recover_ms"] = (time.perf_counter() - returned) * 1000
+
+    results["within_budget"] = all(value < 1000 for key, value in results.items() if key.endswith("_ms"))
+    return results
+
+
+def bench_profiler_overhead():
+    """Page-flip latency with the sampling profiler off and on, and the sampler's own CPU use."""
+    from controller import Controller
+    from profiler import SamplingProfiler
+    controller, deck = get_app()
+    results = {}
+    for mode in ("off", "on"):
+        sampler = SamplingProfiler(output_dir=os.path.join(BENCH_RESULTS_PATH, "profiles"))
+        if mode == "on":
+            sampler.start()
+        show_page(controller, deck, 0)
+        latencies = []
+        started = time.perf_counter()
+        for i in range(args.presses):
+            key = Controller.NAV_FORWARD_INDEX if i % 2 == 0 else Controller.NAV_BACK_INDEX
+            pressed = time.perf_counter()
+            deck.press(key)
+            settle(controller, deck)
+            latencies.append(deck.last_write_time - pressed)
+        results[mode] = summarize(latencies)
+        if mode == "on":
+            elapsed = time.perf_counter() - started
+            sampler.stop()
+            results["sampler_cpu_percent"] = sampler.sampler_cpu / elapsed * 100
+            results["samples"] = sum(sampler.samples.values())
+    return results
+
+
+def bench_gc_tail():
+    """
+    Per-message routing cost during bursts of MIDI, with cyclic garbage being
+    made in the background, under default GC and in show mode.
+    """
+    import gc
+    import threading
+    import mido
+    import midi
+    from realtime import ShowMode, mark_activity
+    get_app()
+    midi.open_output()  # Routed to directly below, possibly before the forwarding thread opened it
+    # Long-lived state a full collection has to traverse (song data, caches, pylive objects)
+    ballast = [{"index": i, "name": f"clip {i}", "notes": [i, i + 1]} for i in range(args.gc_ballast)]
+    messages = [mido.Message("note_on", note=36 + i % 48, velocity=100) for i in range(64)]
+
+    stop = threading.Event()
+
+    def churn(history):
+        # Reference cycles like the ones OSC handlers and pylive queries leave behind,
+        # plus a trickle of state that lives on (history, caches) and ages into the oldest generation
+        while not stop.is_set():
+            for i in range(200):
+                node = {"args": [0.5, 1.0]}
+                node["self"] = node
+                if i % 4 == 0:
+                    history.append([0.5, i])
+            time.sleep(0.001)
+
+    results = {}
+    for mode in ("default", "show"):
+        show = ShowMode()
+        if mode == "show":
+            show.enable()
+        gc_pauses = []
+        gc_started = []
+
+        def on_gc(phase, info):
+            if phase == "start":
+                gc_started.append(time.perf_counter())
+            elif gc_started:
+                gc_pauses.append(time.perf_counter() - gc_started.pop())
+
+        gc.callbacks.append(on_gc)
+        stop.clear()
+        churner = threading.Thread(target=churn, args=([],), name="gc-churn", daemon=True)
+        churner.start()
+        latencies = []
+        try:
+            for burst in range(args.gc_bursts):
+                # A message is due every 0.5 ms; latency runs from when it was due, so
+                # time spent waiting for a collection on another thread counts too
+                due = time.perf_counter()
+                burst_end = due + 0.2
+                i = 0
+                while due < burst_end:
+                    delay = due - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                    mark_activity()
+                    midi.route_message(messages[i % len(messages)])
+                    latencies.append(time.perf_counter() - due)
+                    due += 0.0005
+                    i += 1
+                time.sleep(0.3)  # Between phrases: show mode collects here
+        finally:
+            stop.set()
+            churner.join()
+            gc.callbacks.remove(on_gc)
+            show.disable()
+        results[mode] = summarize(latencies)
+        results[mode]["gc_collections"] = len(gc_pauses)
+        results[mode]["gc_max_pause_ms"] = max(gc_pauses, default=0.0) * 1000
+    del ballast
+    return results
+
+
+BENCHMARKS = {
+    "startup": bench_startup,
+    "press_to_osc": bench_press_to_osc,
+    "page_flip": bench_page_flip,
+    "key_mash": bench_key_mash,
+    "render_throughput": bench_render_throughput,
+    "midi_forward": bench_midi_forward,
+    "midi_router": bench_midi_router,
+    "midi_throughput": bench_midi_throughput,
+    "midi_clock_jitter": bench_midi_clock_jitter,
+    "playhead_progress": bench_playhead_progress,
+    "hotplug": bench_hotplug,
+    "profiler_overhead": bench_profiler_overhead,
+    "gc_tail": bench_gc_tail,
+}
+
+
+def git_revision():
+    """Returns the short commit hash of the tree, with -dirty if it has local changes."""
+    try:
+        revision = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                  text=True, check=True, cwd=BASE_DIR).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True,
+                               text=True, check=True, cwd=BASE_DIR).stdout.strip()
+        return revision + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def flatten(results, prefix=""):
+    """Flattens nested result dicts into {"case.metric": number}."""
+    flat = {}
+    for name, value in results.items():
+        key = f"{prefix}{name}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, key + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[key] = value
+    return flat
+
+
+def compare(old_report, new_report):
+    """Prints every metric of new_report next to the same metric in an earlier report."""
+    old = flatten(old_report["results"])
+    new = flatten(new_report["results"])
+    print(f"\n{'metric':<45} {old_report['revision']:>12} {new_report['revision']:>12} {'change':>8}")
+    for key in sorted(new):
+        if key not in old:
+            continue
+        change = f"{(new[key] - old[key]) / old[key] * 100:+.1f}%" if old[key] else "n/a"
+        print(f"{key:<45} {old[key]:>12.3f} {new[key]:>12.3f} {change:>8}")
+
+
+def run(names):
+    results = {}
+    for name in names:
+        print(f"Running {name}...", flush=True)
+        results[name] = BENCHMARKS[name]()
+        print(json.dumps(results[name], indent=2), flush=True)
+    return {
+        "revision": git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "live_latency_s": args.live_latency,
+        "results": results,
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="LiveDeck end-to-end benchmarks on fake hardware")
+    parser.add_argument("benchmarks", nargs="*", help=f"Benchmarks to run (default: all): {', '.join(BENCHMARKS)}")
+    parser.add_argument("--output", help="Result file (default: bench_results/<revision>.json)")
+    parser.add_argument("--compare", help="Earlier result file to compare against")
+    parser.add_argument("--live-latency", type=float, default=0.001,
+                        help="Simulated round trip per pylive call, in seconds")
+    parser.add_argument("--presses", type=int, default=30, help="Key presses per latency benchmark")
+    parser.add_argument("--startup-runs", type=int, default=5, help="Processes to time for startup")
+    parser.add_argument("--render-runs", type=int, default=10, help="Full re-renders per mode")
+    parser.add_argument("--midi-messages", type=int, default=500, help="Synthetic messages for midi_forward")
+    parser.add_argument("--throughput-messages", type=int, default=50000, help="Messages per midi_throughput run")
+    parser.add_argument("--throughput-runs", type=int, default=5, help="Runs per path; the fastest counts")
+    parser.add_argument("--recording", help="Session recording to replay for midi_forward instead of synthetic notes")
+    parser.add_argument("--replay-speed", type=float, default=10.0, help="Replay rate for --recording")
+    parser.add_argument("--jitter-duration", type=float, default=5.0, help="Seconds to run the MIDI clock")
+    parser.add_argument("--progress-duration", type=float, default=3.0, help="Seconds of playhead updates")
+    parser.add_argument("--gc-ballast", type=int, default=200000, help="Long-lived objects for gc_tail")
+    parser.add_argument("--gc-bursts", type=int, default=10, help="Bursts of MIDI per gc_tail mode")
+    parser.add_argument("--startup-child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--router-child", nargs=argparse.REMAINDER, help=argparse.SUPPRESS)
+    parsed = parser.parse_args(argv)
+    unknown = [name for name in parsed.benchmarks if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(unknown)}")
+    return parsed
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    os.makedirs(BENCH_RESULTS_PATH, exist_ok=True)
+    # Route application logging to a file before any module configures it
+    logging.basicConfig(filename=os.path.join(BENCH_RESULTS_PATH, "bench.log"), level=logging.INFO, force=True,
+                        format="%(asctime)s [%(levelname)s] %(threadName)s %(message)s")
+    backend = backends.use("fake", live_latency=args.live_latency)
+
+    if args.startup_child:
+        startup_child()
+        sys.exit(0)
+    if args.router_child is not None:
+        router_child(args.router_child)
+        sys.exit(0)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+
+    report = run(args.benchmarks or list(BENCHMARKS))
+    output = args.output or os.path.join(BENCH_RESULTS_PATH, f"{report['revision']}.json")
+    with open(output, "w") as file:
+        json.dump(report, file, indent=2)
+    print(f"Results written to {output}")
+    if baseline:
+        compare(baseline, report)
+
+    # Benchmarks with a hard budget (e.g. hotplug recovery) fail the run when they miss it
+    over_budget = [name for name, result in report["results"].items()
+                   if isinstance(result, dict) and result.get("within_budget") is False]
+    if over_budget:
+        print(f"Over budget: {', '.join(over_budget)}")
+        sys.exit(1)
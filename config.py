@@ -8,6 +8,8 @@ SONG_DB_PATH = os.path.join(BASE_DIR, "config", "songs.json")
 FONT_PATH = os.path.join(BASE_DIR, "assets", "DepartureMono-Regular.otf")
 STOP_ICON_PATH = os.path.join(BASE_DIR, "assets", "stop.png")
 STREAMDECK_BRIGHTNESS = 50
+PLAYHEAD_FPS = 10  # Refresh rate of the progress strip on the playing song's key
+OSC_LISTEN_PORT = 8001  # Port the Max for Live device sends playhead updates to
 
 DEFAULT_PATHS = {
     'artwork': 'assets/artwork',
@@ -4,13 +4,17 @@ import os
 import json
 import logging
 import time
-import mido
 import threading
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image
 from StreamDeck.ImageHelpers import PILHelper
 from screen import InfoBar
 from ableton import play_track, stop_all
-from config import BASE_DIR, SONG_DB_PATH, load_json
+from config import BASE_DIR, SONG_DB_PATH, PLAYHEAD_FPS, DEFAULT_PATHS, load_json
+from utils import load_font, compose_song_key, render_song_key, render_pressed_key, decode_native_key, PRESSED_COLOR
+from artpack import KeyImagePack
+from progress import PlayheadProgress
+from intents import IntentQueue
+from realtime import mark_activity
 
 logging.basicConfig(level=logging.INFO)
 
@@ -20,15 +24,23 @@ MIDI_NOTE_MAP = {
     "G": 44, "G#": 45, "A": 46, "A#": 47, "B": 48
 }
 
+# Note on/off bytes sent for each song key, encoded once (channel 1, velocity 64)
+MIDI_KEY_MESSAGES = {
+    key: (bytes([0x90, note - 1, 64]), bytes([0x80, note - 1, 64]))
+    for key, note in MIDI_NOTE_MAP.items()
+}
+
 class Controller:
     SONGS_PER_PAGE = 7       # Main keys 0-6 for songs
     STOP_BUTTON_INDEX = 7    # Main key 7 for the stop button
     NAV_BACK_INDEX = 8       # Touch key for previous page
     NAV_FORWARD_INDEX = 9    # Touch key for next page
+    PRESSED_COLOR = PRESSED_COLOR  # Highlight on a key whose press is being applied
 
     # Cache for raw icon images and final rendered button images
     icon_cache = {}
     button_image_cache = {}
+    pressed_image_cache = {}
 
     @staticmethod
     def get_key_size(deck):
@@ -39,15 +51,24 @@ class Controller:
                 return tuple(key_size)
         return tuple(fmt)
 
-    def __init__(self, outport):
+    def __init__(self, outport, midi_clock=None):
         self.outport = outport
+        self.midi_clock = midi_clock
         self.song_data = load_json(SONG_DB_PATH).get("songs", [])
         self.current_page = 0
         logging.info("Loaded song data: %s", json.dumps(self.song_data, indent=2))
         self.artwork_path = "assets/artwork"
         self.font_path = os.path.join(BASE_DIR, "assets", "DepartureMono-Regular.otf")
-        self.font = ImageFont.truetype(self.font_path, 14)
+        self.font = load_font(self.font_path, 14)
         self.info_bar = None
+        self.key_image_pack = None
+        self.playing_song_index = None
+        self.playhead_progress = None
+        # Held while key presses update the deck; background animations only try-acquire it
+        self.deck_lock = threading.Lock()
+        # Keys showing a press highlight until the intent worker repaints them; guarded by deck_lock
+        self.acknowledged_keys = set()
+        self.intents = IntentQueue(self)
 
     def initialize_info_bar(self, deck):
         """
@@ -64,41 +85,108 @@ class Controller:
         """
         if self.info_bar is None:
             self.initialize_info_bar(deck)
-        thread = threading.Thread(target=self.info_bar.run_loop, daemon=True)
+        thread = threading.Thread(target=self.info_bar.run_loop, name="infobar", daemon=True)
         thread.start()
 
+    def start_playhead_progress(self, deck, fps=PLAYHEAD_FPS):
+        """
+        Starts drawing playhead progress on the playing song's key.
+
+        Returns:
+            PlayheadProgress: Its handle_osc method receives the playhead updates.
+        """
+        if self.playhead_progress is None:
+            self.playhead_progress = PlayheadProgress(self, deck, fps)
+            self.playhead_progress.start()
+        return self.playhead_progress
+
+    def visible_key(self, song_index):
+        """Returns the key showing a song on the current page, or None."""
+        if song_index is None:
+            return None
+        key = song_index - self.current_page * Controller.SONGS_PER_PAGE
+        if 0 <= key < Controller.SONGS_PER_PAGE:
+            return key
+        return None
+
     def load_icon(self, icon_path, key_size):
-        """Load an icon from disk using cache."""
+        """Load an icon from disk using cache, falling back to the default artwork like artpack.py."""
         if icon_path in Controller.icon_cache:
             return Controller.icon_cache[icon_path]
         try:
             icon = Image.open(icon_path).convert("RGBA")
-        except FileNotFoundError:
+        except (FileNotFoundError, IsADirectoryError):
             logging.warning("Image not found: %s, using default.", icon_path)
-            icon = Image.new("RGBA", key_size, (0, 0, 0, 0))
+            default_path = os.path.join(BASE_DIR, DEFAULT_PATHS["default_image"])
+            try:
+                icon = Image.open(default_path).convert("RGBA")
+            except FileNotFoundError:
+                icon = Image.new("RGBA", key_size, (0, 0, 0, 255))
         Controller.icon_cache[icon_path] = icon
         return icon
 
+    def load_stop_icon(self, deck):
+        """Load the stop icon, or a red square if it is missing."""
+        stop_icon_path = os.path.join(BASE_DIR, "assets", "stop.png")
+        try:
+            return Image.open(stop_icon_path).convert("RGBA")
+        except FileNotFoundError:
+            return Image.new("RGBA", Controller.get_key_size(deck), (255, 0, 0))
+
     def pre_render_all_buttons(self, deck):
         """
         Pre-render and cache all button images for the entire song list.
+        Images are taken from the deck model's key image pack (see artpack.py)
+        when it has an up-to-date entry, and rendered otherwise.
         This should be called once after the deck is initialized.
         """
         key_size = Controller.get_key_size(deck)
+        if self.key_image_pack is None:
+            self.key_image_pack = KeyImagePack.for_deck(deck)
+        packed = 0
         for song in self.song_data:
             cache_key = song.get("id", song.get("title", "unknown"))
             if cache_key not in Controller.button_image_cache:
-                icon_path = os.path.join(BASE_DIR, song.get("image", ""))
-                icon = self.load_icon(icon_path, key_size)
-                image = PILHelper.create_scaled_key_image(deck, icon)
-                draw = ImageDraw.Draw(image)
-                draw.rectangle((0, 64, 96, 96), fill=(0, 0, 0))
-                draw.text((image.width / 2, image.height - 10),
-                          song.get("title", ""),
-                          font=self.font, anchor="ms", fill="white")
-                native_img = PILHelper.to_native_key_format(deck, image)
+                native_img = self.key_image_pack.get(song) if self.key_image_pack else None
+                if native_img is not None:
+                    packed += 1
+                else:
+                    icon_path = os.path.join(BASE_DIR, song.get("image", ""))
+                    icon = self.load_icon(icon_path, key_size)
+                    native_img = render_song_key(deck, icon, song.get("title", ""), self.font)
                 Controller.button_image_cache[cache_key] = native_img
-        logging.info("Pre-rendered %d button images", len(Controller.button_image_cache))
+        logging.info("Pre-rendered %d button images (%d from key image pack)",
+                     len(Controller.button_image_cache), packed)
+        # Render press highlights in the background so the first press of each key is instant too
+        threading.Thread(target=self.pre_render_pressed_images, args=(deck,),
+                         name="pressed-image-render", daemon=True).start()
+
+    def pre_render_pressed_images(self, deck):
+        """
+        Cache the pressed variant of every song key and the stop key, taking song
+        keys from the key image pack where possible and rendering the rest.
+        """
+        self.pressed_key_image(deck, Controller.STOP_BUTTON_INDEX)
+        for song in self.song_data:
+            self.pressed_key_image(deck, None, song)
+
+    def compose_button(self, deck, song):
+        """Compose a song's button as a PIL image (before conversion to the native format)."""
+        key_size = Controller.get_key_size(deck)
+        icon_path = os.path.join(BASE_DIR, song.get("image", ""))
+        icon = self.load_icon(icon_path, key_size)
+        return compose_song_key(deck, icon, song.get("title", ""), self.font)
+
+    def displayed_button(self, deck, song):
+        """
+        Return a song's button as shown on the deck (packed or rendered), decoded
+        into a PIL image for overlays such as the playhead progress strip.
+        """
+        cache_key = song.get("id", song.get("title", "unknown"))
+        native_img = Controller.button_image_cache.get(cache_key)
+        if native_img is None:
+            native_img = self.render_button(deck, song)
+        return decode_native_key(deck, native_img)
 
     def render_button(self, deck, song):
         """
@@ -112,13 +200,7 @@ class Controller:
 
         icon_path = os.path.join(BASE_DIR, song.get("image", ""))
         icon = self.load_icon(icon_path, key_size)
-        image = PILHelper.create_scaled_key_image(deck, icon)
-        draw = ImageDraw.Draw(image)
-        draw.rectangle((0, 64, 96, 96), fill=(0, 0, 0))
-        draw.text((image.width / 2, image.height - 10),
-                  song.get("title", ""),
-                  font=self.font, anchor="ms", fill="white")
-        native_img = PILHelper.to_native_key_format(deck, image)
+        native_img = render_song_key(deck, icon, song.get("title", ""), self.font)
         Controller.button_image_cache[cache_key] = native_img
         return native_img
 
@@ -129,6 +211,12 @@ class Controller:
         Key 7: Stop button.
         Keys 8 and 9: Navigation indicators.
         """
+        with self.deck_lock:
+            self._paint_buttons(deck)
+
+    def _paint_buttons(self, deck):
+        """Paint every key for the current page. Called with deck_lock held."""
+        self.acknowledged_keys.clear()
         key_size = Controller.get_key_size(deck)
         total_pages = (len(self.song_data) + Controller.SONGS_PER_PAGE - 1) // Controller.SONGS_PER_PAGE
         start_index = self.current_page * Controller.SONGS_PER_PAGE
@@ -155,12 +243,7 @@ class Controller:
             deck.set_key_image(key, native_img)
 
         # Stop button on key 7
-        stop_icon_path = os.path.join(BASE_DIR, "assets", "stop.png")
-        try:
-            stop_icon = Image.open(stop_icon_path).convert("RGBA")
-        except FileNotFoundError:
-            stop_icon = Image.new("RGBA", key_size, (255, 0, 0))
-        scaled = PILHelper.create_scaled_key_image(deck, stop_icon)
+        scaled = PILHelper.create_scaled_key_image(deck, self.load_stop_icon(deck))
         native_img = PILHelper.to_native_key_format(deck, scaled)
         deck.set_key_image(Controller.STOP_BUTTON_INDEX, native_img)
 
@@ -175,42 +258,119 @@ class Controller:
         else:
             deck.set_key_color(Controller.NAV_FORWARD_INDEX, 0, 0, 0)
 
+        # The playing song's key was repainted without its progress strip
+        if self.playhead_progress:
+            self.playhead_progress.invalidate()
+
     def handle_button_press(self, deck, key, state):
-        """Handle key presses for song selection, stopping, and page navigation."""
+        """
+        Handle key presses for song selection, stopping, and page navigation.
+        The pressed key is acknowledged immediately; the work itself is queued
+        as an intent so rapid presses collapse into the latest one.
+        """
         total_pages = (len(self.song_data) + Controller.SONGS_PER_PAGE - 1) // Controller.SONGS_PER_PAGE
         if not state:
             return  # Process only key down events
+        mark_activity()
 
+        page = self.intents.page  # Includes page flips that are still queued
         if key == Controller.STOP_BUTTON_INDEX:
             logging.info("Stop button pressed.")
-            stop_all()
-            self.update_buttons(deck)
-        elif key == Controller.NAV_BACK_INDEX and self.current_page > 0:
+            self.acknowledge_press(deck, key)
+            self.intents.submit_stop(deck)
+        elif key == Controller.NAV_BACK_INDEX and page > 0:
             logging.info("Navigating to previous page.")
-            self.current_page -= 1
-            self.update_buttons(deck)
-        elif key == Controller.NAV_FORWARD_INDEX and self.current_page < total_pages - 1:
+            self.acknowledge_press(deck, key)
+            self.intents.submit_page(deck, page - 1)
+        elif key == Controller.NAV_FORWARD_INDEX and page < total_pages - 1:
             logging.info("Navigating to next page.")
-            self.current_page += 1
-            self.update_buttons(deck)
+            self.acknowledge_press(deck, key)
+            self.intents.submit_page(deck, page + 1)
         elif key < Controller.SONGS_PER_PAGE:
-            song_index = self.current_page * Controller.SONGS_PER_PAGE + key
+            song_index = page * Controller.SONGS_PER_PAGE + key
             if song_index < len(self.song_data):
-                song = self.song_data[song_index]
-                logging.info("Playing song: %s", song.get("title", "Unknown"))
-                stop_all()
-                play_track(song.get("ableton_track"))
-                self.send_midi_key(song.get("key"))
-                self.update_buttons(deck)
+                self.acknowledge_press(deck, key, self.song_data[song_index])
+                self.intents.submit_song(deck, song_index)
+
+    def acknowledge_press(self, deck, key, song=None):
+        """Highlight a pressed key until its intent has been applied."""
+        with self.deck_lock:
+            self.acknowledged_keys.add(key)
+            if key in (Controller.NAV_BACK_INDEX, Controller.NAV_FORWARD_INDEX):
+                deck.set_key_color(key, *Controller.PRESSED_COLOR)
+            else:
+                deck.set_key_image(key, self.pressed_key_image(deck, key, song))
+
+    def pressed_key_image(self, deck, key, song=None):
+        """Return the highlighted variant of a song key or the stop key, rendering it once."""
+        # Tagged, so a song whose id equals the stop key's index can't share its entry
+        cache_key = ("song", song.get("id", song.get("title", "unknown"))) if song else ("stop",)
+        if cache_key in Controller.pressed_image_cache:
+            return Controller.pressed_image_cache[cache_key]
+        native_img = self.key_image_pack.get_pressed(song) if song and self.key_image_pack else None
+        if native_img is None:
+            if song:
+                image = self.compose_button(deck, song)
+            else:
+                image = PILHelper.create_scaled_key_image(deck, self.load_stop_icon(deck))
+            native_img = render_pressed_key(deck, image)
+        Controller.pressed_image_cache[cache_key] = native_img
+        return native_img
+
+    def stop_playback(self):
+        """Stop everything in Live and the MIDI clock."""
+        stop_all()
+        self.playing_song_index = None
+        if self.midi_clock:
+            self.midi_clock.send_stop()
+
+    def play_song(self, song_index, superseded=lambda: False):
+        """
+        Switch Live to a song.
+
+        Args:
+            song_index (int): Index into the song list.
+            superseded (callable): Returns True once a newer press has replaced this one;
+                the remaining round trips to Live are then skipped.
+        """
+        song = self.song_data[song_index]
+        logging.info("Playing song: %s", song.get("title", "Unknown"))
+        if superseded():
+            logging.info("Skipping superseded song: %s", song.get("title", "Unknown"))
+            return
+        stop_all(superseded)
+        self.playing_song_index = None
+        if superseded():
+            logging.info("Skipping superseded song: %s", song.get("title", "Unknown"))
+            return
+        play_track(song.get("ableton_track"))
+        self.playing_song_index = song_index
+        if self.playhead_progress:
+            self.playhead_progress.position = 0.0
+        if superseded():
+            return
+        if self.midi_clock:
+            self.midi_clock.send_start()
+        self.send_midi_key(song.get("key"))
+
+    def reopen_outport(self, outport):
+        """Use a reopened MIDI output port for key notes and the MIDI clock, and close the old one."""
+        old_outport, self.outport = self.outport, outport
+        if self.midi_clock:
+            self.midi_clock.outport = outport
+        if old_outport is not None and old_outport is not outport:
+            try:
+                old_outport.close()
+            except Exception:
+                pass
 
     def send_midi_key(self, song_key):
         """Convert song key to MIDI note and send it."""
-        if song_key in MIDI_NOTE_MAP:
-            adjusted_note = MIDI_NOTE_MAP[song_key] - 1
-            msg = mido.Message("note_on", note=adjusted_note, velocity=64)
-            self.outport.send(msg)
+        if song_key in MIDI_KEY_MESSAGES:
+            note_on, note_off = MIDI_KEY_MESSAGES[song_key]
+            self.outport.send_bytes(note_on)
             time.sleep(0.1)
-            self.outport.send(mido.Message("note_off", note=adjusted_note, velocity=64))
-            logging.info(f"Sent MIDI note {adjusted_note} for key {song_key}")
+            self.outport.send_bytes(note_off)
+            logging.info(f"Sent MIDI note {note_on[1]} for key {song_key}")
         else:
             logging.warning(f"Invalid song key: {song_key}")
\ No newline at end of file
@@ -0,0 +1,128 @@
+# --- intents.py ---
+
+import time
+import logging
+import threading
+from realtime import show_mode
+
+TRANSPORT_SETTLE = 0.03  # Seconds a song or stop press waits for a replacing press before talking to Live
+
+
+class IntentQueue:
+    """
+    Turns key presses into intents and applies only the latest of them.
+
+    Presses are recorded from the deck's callback thread and return at once.
+    A worker thread applies whatever is pending, collapsing superseded work:
+    several page flips become one repaint of the final page, and a song or stop
+    press replaces a song switch that has not finished talking to Live yet.
+    A song or stop press is held for TRANSPORT_SETTLE seconds first, so one
+    replaced within that window never makes a round trip to Live at all.
+    """
+
+    def __init__(self, controller):
+        self.controller = controller
+        self.page = controller.current_page  # Page shown once pending flips are applied
+        self.coalesced = 0                   # Intents dropped because a newer one replaced them
+
+        self._cond = threading.Condition()
+        self._deck = None
+        self._page_dirty = False
+        self._transport = None   # ("song", song_index) or ("stop", None)
+        self._generation = 0     # Bumped by every transport intent
+        self._transport_at = 0.0  # time.monotonic() of the latest transport intent
+        self._busy = False
+        self._thread = None
+
+    def _submit(self, deck):
+        """Records the deck and starts the worker on first use. Called with the lock held."""
+        self._deck = deck
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="intent-worker", daemon=True)
+            self._thread.start()
+            show_mode.adopt(self._thread)
+        self._cond.notify()
+
+    def submit_page(self, deck, page):
+        """Queues a switch to `page`; intermediate pages are never drawn."""
+        with self._cond:
+            if self._page_dirty:
+                self.coalesced += 1
+            self.page = page
+            self._page_dirty = True
+            self._submit(deck)
+
+    def submit_song(self, deck, song_index):
+        """Queues playing a song, replacing any pending song or stop."""
+        self._submit_transport(deck, ("song", song_index))
+
+    def submit_stop(self, deck):
+        """Queues stopping playback, replacing any pending song."""
+        self._submit_transport(deck, ("stop", None))
+
+    def _submit_transport(self, deck, transport):
+        with self._cond:
+            if self._transport is not None:
+                self.coalesced += 1
+            self._transport = transport
+            self._transport_at = time.monotonic()
+            self._generation += 1
+            self._submit(deck)
+
+    def superseded(self, generation):
+        """Returns True if a transport intent newer than `generation` has been queued."""
+        return self._generation != generation
+
+    def wait_idle(self, timeout=5.0):
+        """Blocks until every queued intent has been applied. Returns False on timeout."""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self._busy or self._page_dirty or self._transport is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def _run(self):
+        controller = self.controller
+        while True:
+            with self._cond:
+                # Page flips go at once; a lone song or stop waits out the settle window
+                while not self._page_dirty:
+                    if self._transport is None:
+                        self._busy = False
+                        self._cond.notify_all()
+                        self._cond.wait()
+                        continue
+                    settle = self._transport_at + TRANSPORT_SETTLE - time.monotonic()
+                    if settle <= 0:
+                        break
+                    self._cond.wait(settle)
+                self._busy = True
+                deck = self._deck
+                page_dirty, self._page_dirty = self._page_dirty, False
+                transport, self._transport = self._transport, None
+                generation = self._generation
+
+            try:
+                # Paint the new page before any slow round trips to Live
+                if page_dirty:
+                    self._repaint(deck)
+                if transport is not None:
+                    action, song_index = transport
+                    if action == "stop":
+                        controller.stop_playback()
+                    else:
+                        controller.play_song(song_index, lambda: self.superseded(generation))
+                    # Clears the press acknowledgement, unless newer work will repaint anyway
+                    self._repaint(deck)
+            except Exception as e:
+                logging.error("Error applying key press: %s", e)
+
+    def _repaint(self, deck):
+        with self._cond:
+            if self._page_dirty or self._transport is not None:
+                return
+            self.controller.current_page = self.page
+        self.controller.update_buttons(deck)
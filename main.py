@@ -5,12 +5,18 @@
 import time
 import os
 import logging
-import mido
 import threading
-from midi import forward_midi
+import backends
+from midi import forward_midi, start_recording, stop_recording
+from router import MidiRouterProcess
+from recorder import session_path
 from controller import Controller
 from streamdeck import initialize_streamdeck
+from supervisor import DeviceSupervisor
+from profiler import profiler, toggle_profiling, add_toggle_listener, install_signal_handler
+from realtime import show_mode, add_activity_source
 from config import BASE_DIR
+from midi_clock import MidiClock
 from ableton import ableton, ABLETON_SET_PATH
 
 # Get the script's actual location (the LiveDeck project root)
@@ -18,20 +24,47 @@ BASE_DIR = os.path.abspath(os.path.dirname(__file__))
 os.chdir(BASE_DIR)
 
 ARTWORK_PATH = "assets/artwork"  # Update if needed
+RECORD_MIDI_SESSIONS = True  # Keep a replayable recording of all MIDI input (see recorder.py)
+SHOW_MODE = True  # Freeze startup objects, defer GC to idle moments, boost hot threads (see realtime.py)
+MIDI_ROUTER_PROCESS = True  # Route MIDI in a separate process (see router.py) instead of a thread
+
+# The out-of-process MIDI router, when MIDI_ROUTER_PROCESS is set
+midi_router = None
 
 def init():
     os.makedirs(ARTWORK_PATH, exist_ok=True)
 
 def init_midi_outport():
     midi_output_name = "IAC Driver Bus 2"  # Adjust as needed
-    return mido.open_output(midi_output_name)
+    return backends.current().open_output(midi_output_name)
 
-def main():
-    """Main function that initializes and runs the LiveDeck application."""
+def start(record_midi=RECORD_MIDI_SESSIONS, show=SHOW_MODE, router_process=MIDI_ROUTER_PROCESS):
+    """
+    Initializes LiveDeck and starts its background threads.
+
+    Args:
+        record_midi (bool): Record the MIDI session to disk.
+        show (bool): Enter show mode once everything is loaded.
+        router_process (bool): Route MIDI in a separate process rather than a thread.
+
+    Returns:
+        tuple: (controller, deck), or None if startup failed.
+    """
+    global midi_router
+
+    if router_process:
+        # Start the MIDI router process; it records the session itself
+        midi_router = MidiRouterProcess(record=record_midi, show=show)
+        midi_router.start()
+        add_activity_source(midi_router.last_activity)
+        add_toggle_listener(midi_router.set_profiling)
+    else:
+        if record_midi:
+            start_recording(os.path.join(BASE_DIR, session_path()))
 
-    # Start the MIDI forwarding loop in a daemon thread
-    midi_thread = threading.Thread(target=forward_midi, daemon=True)
-    midi_thread.start()
+        # Start the MIDI forwarding loop in a daemon thread
+        midi_thread = threading.Thread(target=forward_midi, name="midi-forward", daemon=True)
+        midi_thread.start()
 
     os.chdir(BASE_DIR)
     
@@ -40,26 +73,30 @@ def main():
         format='%(asctime)s - %(levelname)s - %(message)s'
     )
     
-    # Initialize the MIDI output port and create a Controller instance with it
+    # Initialize the MIDI output port, the MIDI clock and a Controller instance with them
     outport = init_midi_outport()
-    controller = Controller(outport)
+    midi_clock = MidiClock(outport, tempo_source=ableton.get_tempo)
+    controller = Controller(outport, midi_clock)
     
     # Launch and connect to Ableton
     logging.info("Initializing Ableton Live...")
     if not ableton.launch_set(ABLETON_SET_PATH):
         logging.error("Failed to launch Ableton Live. Exiting.")
-        return
+        return None
         
     if not ableton.connect_to_set():
         logging.error("Failed to connect to Ableton Live set. Exiting.")
-        return
+        return None
+
+    # Start MIDI clock output, following the set's tempo
+    midi_clock.start_thread()
     
     # Initialize StreamDeck
     logging.info("Initializing Stream Deck...")
     deck = initialize_streamdeck()
     if not deck:
         logging.error("Failed to initialize Stream Deck. Exiting.")
-        return
+        return None
     
     # Pre-render all buttons
     controller.pre_render_all_buttons(deck)
@@ -70,16 +107,55 @@ def main():
     # Register Controller's method as the callback for key events.
     deck.set_key_callback(lambda d, key, state: controller.handle_button_press(d, key, state))
     controller.update_buttons(deck)
-    
+
+    # Show playhead progress reported by the Max for Live device; /profile toggles the profiler
+    progress = controller.start_playhead_progress(deck)
+    ableton.start_osc_listener({"/playhead": progress.handle_osc, "/profile": toggle_profiling})
+
+    # Reconnect the deck and MIDI ports if they are unplugged and come back
+    DeviceSupervisor(controller, deck, router=midi_router).start()
+
+    # Everything long-lived exists now; keep the collector off the performance path
+    if show:
+        show_mode.enable([getattr(deck, "read_thread", None)])
+    return controller, deck
+
+def shutdown(controller, deck):
+    """Stops the MIDI clock and releases the Stream Deck."""
+    logging.info("Shutting down LiveDeck...")
+    controller.midi_clock.shutdown()
+    profiler.stop()
+    show_mode.disable()
+    if midi_router:
+        midi_router.stop()
+    # The forwarding thread is a daemon, so its own cleanup never runs; flush and close the recording here
+    stop_recording()
+    if controller.playhead_progress:
+        controller.playhead_progress.stop()
+    deck.reset()
+    deck.close()
+    logging.info("Shutdown complete.")
+
+def main():
+    """Main function that initializes and runs the LiveDeck application."""
+    # `kill -USR1 <pid>` starts the sampling profiler; the next one writes the profile.
+    # Registered first, since the default action for SIGUSR1 would kill a starting app
+    install_signal_handler()
+
+    app = start()
+    if app is None:
+        return
+    controller, deck = app
+
     try:
         logging.info("LiveDeck running. Press Ctrl+C to exit.")
         while True:
             time.sleep(1)
+            # Bring the MIDI router back if it crashed
+            if midi_router:
+                midi_router.ensure_running()
     except KeyboardInterrupt:
-        logging.info("Shutting down LiveDeck...")
-        deck.reset()
-        deck.close()
-        logging.info("Shutdown complete.")
+        shutdown(controller, deck)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
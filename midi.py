@@ -1,8 +1,11 @@
 # --- midi.py ---
 
-import mido
 import time
 import logging
+import threading
+import backends
+from recorder import MidiRecorder
+from realtime import mark_activity
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
 
@@ -12,9 +15,7 @@ MIDI_NOTE_MAP = {
     "G": 44, "G#": 45, "A": 46, "A#": 47, "B": 48
 }
 
-# List available MIDI ports
-logging.info("Available MIDI Inputs: %s", mido.get_input_names())
-logging.info("Available MIDI Outputs: %s", mido.get_output_names())
+backend = backends.current()
 
 # Define the MIDI input sources (Modify these based on your setup)
 midi_inputs = [
@@ -24,7 +25,18 @@ midi_inputs = [
 
 # Define the MIDI output (Aggregate destination)
 midi_output_name = "IAC Driver Bus 2"  # Change to the desired virtual MIDI output
-outport = mido.open_output(midi_output_name)
+# Opened by open_output() in whichever process forwards MIDI, so the app can import
+# this module for the port names while the router process owns the output
+outport = None
+
+def open_output():
+    """Lists the available MIDI ports and opens the forwarding output, unless it is already open."""
+    global outport
+    if outport is None:
+        logging.info("Available MIDI Inputs: %s", backend.get_input_names())
+        logging.info("Available MIDI Outputs: %s", backend.get_output_names())
+        outport = backend.open_output(midi_output_name)
+    return outport
 
 # Default listen range
 listen_range = (0, 128)  # A0 to C8 (MIDI Note Numbers)
@@ -35,27 +47,165 @@ def set_listen_range(low, high):
     listen_range = (low, high)
     logging.info("Updated Listen Range: %s", listen_range)
 
+# Active session recorder (see recorder.py), or None
+recorder = None
+
+def start_recording(path):
+    """Starts recording every incoming MIDI message to the given file."""
+    global recorder
+    stop_recording()
+    recorder = MidiRecorder(path, midi_inputs)
+    logging.info("Recording MIDI session to %s", path)
+
+def stop_recording():
+    """Stops the active session recording, if any."""
+    global recorder
+    if recorder is not None:
+        recorder.close()
+        logging.info("Stopped MIDI session recording (%d messages)", recorder.count)
+        recorder = None
+
+# Read inputs as raw bytes and filter on those, instead of parsing every message with mido
+RAW_MIDI_INPUT = True
+
+NOTE_OFF = 0x80
+NOTE_ON = 0x90
+
+
+class LazyMessage:
+    """
+    Raw MIDI bytes that become a mido Message only when something asks for one,
+    e.g. a log line that actually gets emitted.
+    """
+
+    __slots__ = ("data", "_msg")
+
+    def __init__(self, data):
+        self.data = data
+        self._msg = None
+
+    @property
+    def message(self):
+        if self._msg is None:
+            import mido
+            self._msg = mido.Message.from_bytes(self.data)
+        return self._msg
+
+    def __getattr__(self, name):
+        return getattr(self.message, name)
+
+    def bytes(self):
+        return list(self.data)
+
+    def __str__(self):
+        return str(self.message)
+
+# Message counters, published to the main app when routing runs in its own process (see router.py)
+stats = {"received": 0, "forwarded": 0, "ignored": 0, "last_message": 0.0}
+
+# Filter a single incoming message and forward it to the output
+def route_message(msg):
+    if msg.type in ["note_on", "note_off"]:
+        if listen_range[0] <= msg.note <= listen_range[1]:
+            # Log a copy of the message with note incremented by 1; only built if the line is emitted
+            if logging.getLogger().isEnabledFor(logging.INFO):
+                logging.info("Forwarding: %s", msg.copy(note=msg.note+1))
+            outport.send(msg)  # Send only within range
+            stats["forwarded"] += 1
+        else:
+            logging.info("Ignored: %s", msg.note)
+            stats["ignored"] += 1
+    else:
+        outport.send(msg)  # Forward non-note messages
+        stats["forwarded"] += 1
+
+# route_message on raw bytes: the status byte and note number decide, nothing is parsed
+def route_bytes(data):
+    kind = data[0] & 0xF0
+    if kind == NOTE_ON or kind == NOTE_OFF:
+        if listen_range[0] <= data[1] <= listen_range[1]:
+            logging.debug("Forwarding: %s", LazyMessage(data))
+            outport.send_bytes(data)
+            stats["forwarded"] += 1
+        else:
+            logging.debug("Ignored: %s", data[1])
+            stats["ignored"] += 1
+    else:
+        outport.send_bytes(data)
+        stats["forwarded"] += 1
+
+# Set when MIDI ports appear or disappear; the forwarding loop then reopens its inputs
+ports_changed = threading.Event()
+PORT_RETRY_INTERVAL = 1.0  # Seconds between attempts to open missing input ports
+POLL_INTERVAL = 0.1  # Seconds between polls of the input ports
+
+def notify_ports_changed():
+    ports_changed.set()
+
+# Reopen the output port after its device came back
+def reopen_output():
+    global outport
+    # Open the new port before retiring the old one, so the global never points at a closed port
+    new_outport = backend.open_output(midi_output_name)
+    old_outport, outport = outport, new_outport
+    if old_outport is not None and old_outport is not new_outport:
+        try:
+            old_outport.close()
+        except Exception:
+            pass
+    logging.info("Reopened MIDI output %s", midi_output_name)
+
+# Route everything waiting on one input port as mido Messages
+def poll_messages(port_index, inport):
+    for msg in inport.iter_pending():
+        mark_activity()
+        stats["received"] += 1
+        stats["last_message"] = time.monotonic()
+        if recorder is not None:
+            # Input ports put the arrival time (perf_counter) in msg.time
+            recorder.record(port_index, msg.bytes(), msg.time or None)
+        route_message(msg)
+
+# Route everything waiting on one input port as raw bytes
+def poll_bytes(port_index, inport):
+    received = 0
+    for arrived, data in inport.iter_pending_bytes():
+        received += 1
+        if recorder is not None:
+            recorder.record(port_index, data, arrived)
+        route_bytes(data)
+    if received:
+        mark_activity()
+        stats["received"] += received
+        stats["last_message"] = time.monotonic()
+
 # Function to forward and process incoming MIDI with filtering
 def forward_midi():
     try:
-        with mido.open_input(midi_inputs[0]) as inport1, mido.open_input(midi_inputs[1]) as inport2:
-            logging.info("Listening on %s and sending to %s", midi_inputs, midi_output_name)
-
-            while True:
-                for inport in [inport1, inport2]:
-                    for msg in inport.iter_pending():
-                        if msg.type in ["note_on", "note_off"]:
-                            if listen_range[0] <= msg.note <= listen_range[1]:
-                                # Log a copy of the message with note incremented by 1
-                                logging.info("Forwarding: %s", msg.copy(note=msg.note+1))
-                                outport.send(msg)  # Send only within range
-                            else:
-                                logging.info("Ignored: %s", msg.note)
-                        else:
-                            outport.send(msg)  # Forward non-note messages
-                time.sleep(0.1)            
+        while True:
+            ports_changed.clear()
+            if RAW_MIDI_INPUT:
+                open_input, poll = backend.open_raw_input, poll_bytes
+            else:
+                open_input, poll = backend.open_input, poll_messages
+            try:
+                open_output()
+                with open_input(midi_inputs[0]) as inport1, open_input(midi_inputs[1]) as inport2:
+                    logging.info("Listening on %s and sending to %s", midi_inputs, midi_output_name)
+
+                    while not ports_changed.is_set():
+                        for port_index, inport in enumerate([inport1, inport2]):
+                            poll(port_index, inport)
+                        ports_changed.wait(POLL_INTERVAL)
+                    logging.info("MIDI ports changed, reopening inputs")
+            except Exception as e:
+                # Missing or vanished ports; keep retrying rather than ending the thread
+                logging.error("MIDI routing interrupted: %s", e)
+                ports_changed.wait(PORT_RETRY_INTERVAL)
     except KeyboardInterrupt:
         logging.info("MIDI Routing Stopped")
+    finally:
+        stop_recording()
 
 # Example Usage: Update listen range dynamically
 set_listen_range(21, 108)  # A0 to C8
@@ -0,0 +1,302 @@
+# --- midi_clock.py ---
+
+import os
+import sys
+import time
+import logging
+import argparse
+import threading
+import multiprocessing
+from utils import percentile
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+
+PPQN = 24                   # MIDI clock pulses per quarter note
+DEFAULT_TEMPO = 120.0       # BPM used until Live reports a tempo
+MIN_TEMPO = 20.0
+MAX_TEMPO = 999.0
+SPIN_THRESHOLD = 0.001      # Stop sleeping this long before a tick and yield-spin instead
+MAX_CATCH_UP_TICKS = PPQN   # Ticks we will burst out after a stall before re-anchoring
+TEMPO_POLL_INTERVAL = 0.5   # Seconds between tempo queries to Live
+
+# Pre-encoded system real-time messages, so the tick path never allocates
+CLOCK = b"\xf8"
+START = b"\xfa"
+CONTINUE = b"\xfb"
+STOP = b"\xfc"
+SONG_POSITION = 0xF2
+
+
+class MidiClock:
+    """
+    Generates 24 PPQN MIDI clock plus start/stop/continue and song position pointer.
+
+    Ticks are scheduled on an absolute monotonic timeline (anchor + n * interval),
+    so the error of one tick never carries over into the next. Tempo changes
+    re-anchor the timeline at the next tick.
+    """
+
+    def __init__(self, outport, bpm=DEFAULT_TEMPO, tempo_source=None, clock=time.perf_counter):
+        """
+        Args:
+            outport: Output port with send_bytes() (see backends.py) to send clock messages to.
+            bpm (float): Initial tempo.
+            tempo_source (callable, optional): Returns the current tempo in BPM (or None).
+                Polled every TEMPO_POLL_INTERVAL seconds, e.g. ableton.get_tempo.
+            clock (callable): Monotonic time source in seconds.
+        """
+        self.outport = outport
+        self.tempo_source = tempo_source
+        self.clock = clock
+        self.bpm = self._clamp_tempo(bpm)
+        self.running = False           # Transport state (start/stop)
+        self.ticks_since_start = 0     # Clock pulses sent since the last start
+
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._shutdown = threading.Event()
+        self._anchor_time = None
+        self._anchor_tick = 0
+        self._tick = 0
+        self._interval = self._tick_interval(self.bpm)
+        self._thread = None
+        self._tempo_thread = None
+        self._send_failing = False
+
+    def _send(self, data):
+        """Sends encoded MIDI bytes, riding out a missing output port until it is reopened."""
+        try:
+            self.outport.send_bytes(data)
+            self._send_failing = False
+        except IOError as e:
+            if not self._send_failing:
+                logging.warning("MIDI clock output unavailable: %s", e)
+                self._send_failing = True
+
+    @staticmethod
+    def _clamp_tempo(bpm):
+        return max(MIN_TEMPO, min(MAX_TEMPO, float(bpm)))
+
+    @staticmethod
+    def _tick_interval(bpm):
+        return 60.0 / (bpm * PPQN)
+
+    def start_thread(self):
+        """Starts the clock (and, if a tempo source is set, the tempo follower) threads."""
+        if self._thread is not None:
+            return
+        self._shutdown.clear()
+        self._thread = threading.Thread(target=self._run, name="midi-clock", daemon=True)
+        self._thread.start()
+        if self.tempo_source is not None:
+            self._tempo_thread = threading.Thread(target=self._follow_tempo, name="midi-clock-tempo", daemon=True)
+            self._tempo_thread.start()
+        logging.info("MIDI clock started at %.2f BPM", self.bpm)
+
+    def shutdown(self):
+        """Stops the transport and the clock threads."""
+        if self.running:
+            self.send_stop()
+        self._shutdown.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+            self._thread = None
+        if self._tempo_thread is not None:
+            self._tempo_thread.join(timeout=1)
+            self._tempo_thread = None
+        logging.info("MIDI clock stopped")
+
+    def set_tempo(self, bpm):
+        """
+        Changes the tempo. The new interval applies from the next tick.
+
+        Args:
+            bpm (float): New tempo in BPM.
+        """
+        bpm = self._clamp_tempo(bpm)
+        with self._lock:
+            if abs(bpm - self.bpm) < 1e-6:
+                return
+            now = self.clock()
+            if self._anchor_time is not None:
+                # Re-anchor at the next scheduled tick so already-elapsed time is kept
+                next_time = self._anchor_time + (self._tick - self._anchor_tick) * self._interval
+                self._anchor_time = max(next_time, now)
+                self._anchor_tick = self._tick
+            self.bpm = bpm
+            self._interval = self._tick_interval(bpm)
+        self._wake.set()
+        logging.info("MIDI clock tempo: %.2f BPM", bpm)
+
+    def send_start(self):
+        """Sends MIDI Start; followers restart from the beginning of the song."""
+        with self._lock:
+            self.running = True
+            self.ticks_since_start = 0
+            self._send(START)
+        logging.info("MIDI clock: start")
+
+    def send_stop(self):
+        """Sends MIDI Stop. Clock pulses keep flowing so followers hold the tempo."""
+        with self._lock:
+            self.running = False
+            self._send(STOP)
+        logging.info("MIDI clock: stop at song position %d", self.song_position())
+
+    def send_continue(self):
+        """Sends MIDI Continue from the current song position."""
+        with self._lock:
+            self.running = True
+            self._send(CONTINUE)
+        logging.info("MIDI clock: continue")
+
+    def song_position(self):
+        """Returns the current song position in MIDI beats (16th notes)."""
+        return self.ticks_since_start // (PPQN // 4)
+
+    def send_song_position(self, sixteenths):
+        """
+        Sends a Song Position Pointer. Only meaningful while the transport is stopped.
+
+        Args:
+            sixteenths (int): Position in MIDI beats (16th notes) from the song start.
+        """
+        sixteenths = max(0, min(16383, int(sixteenths)))
+        with self._lock:
+            if self.running:
+                logging.warning("Ignoring song position %d while transport is running", sixteenths)
+                return
+            self.ticks_since_start = sixteenths * (PPQN // 4)
+            self._send(bytes((SONG_POSITION, sixteenths & 0x7F, sixteenths >> 7)))
+        logging.info("MIDI clock: song position %d", sixteenths)
+
+    def _run(self):
+        """Tick loop: sleep until just before the deadline, then yield-spin onto it."""
+        with self._lock:
+            self._anchor_time = self.clock() + self._interval
+            self._anchor_tick = self._tick
+        while not self._shutdown.is_set():
+            with self._lock:
+                target = self._anchor_time + (self._tick - self._anchor_tick) * self._interval
+            now = self.clock()
+            remaining = target - now
+            if remaining > SPIN_THRESHOLD:
+                # Wakes early on tempo change or shutdown so the deadline is recomputed
+                if self._wake.wait(remaining - SPIN_THRESHOLD):
+                    self._wake.clear()
+                continue
+            while self.clock() < target:
+                time.sleep(0)  # Release the GIL while spinning
+            self._emit(target)
+
+    def _emit(self, target):
+        with self._lock:
+            missed = int((self.clock() - target) / self._interval)
+            if missed > MAX_CATCH_UP_TICKS:
+                # Stalled for too long; skip ahead instead of flooding followers
+                logging.warning("MIDI clock stalled for %d ticks, re-anchoring", missed)
+                self._anchor_time = self.clock()
+                self._anchor_tick = self._tick
+                missed = 0
+            for _ in range(missed + 1):
+                self._send(CLOCK)
+                if self.running:
+                    self.ticks_since_start += 1
+            self._tick += missed + 1
+
+    def _follow_tempo(self):
+        """Polls the tempo source and applies changes."""
+        while not self._shutdown.wait(TEMPO_POLL_INTERVAL):
+            try:
+                bpm = self.tempo_source()
+            except Exception as e:
+                logging.debug("Tempo query failed: %s", e)
+                continue
+            if bpm:
+                self.set_tempo(bpm)
+
+
+class _TimestampPort:
+    """Output port stand-in that records when each clock pulse leaves the scheduler."""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.times = []
+
+    def send_bytes(self, data):
+        if data == CLOCK:
+            self.times.append(self.clock())
+
+
+def _burn_cpu(stop):
+    """Busy loop used to load the machine during the jitter benchmark."""
+    while not stop.is_set():
+        sum(i * i for i in range(1000))
+
+
+def measure_jitter(duration=10.0, bpm=DEFAULT_TEMPO, load_procs=None, load_threads=0):
+    """
+    Runs the clock against a timestamping port and reports tick timing errors.
+
+    Args:
+        duration (float): Seconds to run the clock for.
+        bpm (float): Tempo to generate.
+        load_procs (int, optional): CPU-burning processes to run alongside (defaults to one per core).
+        load_threads (int): CPU-burning threads in this interpreter, to include GIL contention.
+
+    Returns:
+        dict: Inter-tick error and absolute drift percentiles in microseconds.
+    """
+    if load_procs is None:
+        load_procs = os.cpu_count() or 1
+
+    proc_stop = multiprocessing.Event()
+    thread_stop = threading.Event()
+    procs = [multiprocessing.Process(target=_burn_cpu, args=(proc_stop,), daemon=True) for _ in range(load_procs)]
+    threads = [threading.Thread(target=_burn_cpu, args=(thread_stop,), daemon=True) for _ in range(load_threads)]
+    for worker in procs + threads:
+        worker.start()
+
+    port = _TimestampPort(time.perf_counter)
+    midi_clock = MidiClock(port, bpm=bpm)
+    try:
+        midi_clock.start_thread()
+        time.sleep(duration)
+    finally:
+        midi_clock.shutdown()
+        proc_stop.set()
+        thread_stop.set()
+        for worker in procs + threads:
+            worker.join(timeout=2)
+
+    interval = MidiClock._tick_interval(midi_clock.bpm)
+    times = port.times
+    tick_errors = [abs((b - a) - interval) * 1e6 for a, b in zip(times, times[1:])]
+    drift = [abs(t - (times[0] + i * interval)) * 1e6 for i, t in enumerate(times)]
+    return {
+        "platform": sys.platform,
+        "bpm": bpm,
+        "ticks": len(times),
+        "load_procs": load_procs,
+        "load_threads": load_threads,
+        "interval_us": interval * 1e6,
+        "tick_error_p50_us": percentile(tick_errors, 50),
+        "tick_error_p99_us": percentile(tick_errors, 99),
+        "tick_error_max_us": max(tick_errors, default=0.0),
+        "drift_p99_us": percentile(drift, 99),
+        "drift_final_us": drift[-1] if drift else 0.0,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="MIDI clock jitter benchmark")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds to run")
+    parser.add_argument("--bpm", type=float, default=DEFAULT_TEMPO, help="Tempo to generate")
+    parser.add_argument("--load-procs", type=int, default=None, help="CPU-burning processes (default: one per core)")
+    parser.add_argument("--load-threads", type=int, default=0, help="CPU-burning threads in this process")
+    args = parser.parse_args()
+
+    result = measure_jitter(args.duration, args.bpm, args.load_procs, args.load_threads)
+    for name, value in result.items():
+        print(f"{name:>20}: {value:.1f}" if isinstance(value, float) else f"{name:>20}: {value}")
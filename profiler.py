@@ -0,0 +1,253 @@
+# --- profiler.py ---
+
+import os
+import sys
+import json
+import time
+import signal
+import logging
+import threading
+from collections import Counter
+from config import BASE_DIR
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+
+PROFILES_PATH = os.path.join(BASE_DIR, "profiles")
+SAMPLE_INTERVAL = 0.005  # 200 Hz
+
+# Subsystem tag for each LiveDeck thread name
+THREAD_SUBSYSTEMS = {
+    "MainThread": "main",
+    "midi-forward": "midi",
+    "midi-recorder": "midi",
+    "midi-clock": "midi-clock",
+    "midi-clock-tempo": "midi-clock",
+    "intent-worker": "keys",
+    "infobar": "render",
+    "playhead-progress": "render",
+    "pressed-image-render": "render",
+    "osc-listener": "osc",
+    "device-supervisor": "hotplug",
+    "udev-monitor": "hotplug",
+    "gc-idle": "gc",
+}
+
+
+def subsystem_for(thread_name, stack):
+    """
+    Tags a sample with the LiveDeck subsystem it belongs to.
+
+    Calls into pylive are tagged "pylive" whichever thread makes them, and the
+    Stream Deck library's unnamed reader thread is recognised by its frames.
+    """
+    if any(f"{os.sep}live{os.sep}" in filename for _, filename, _ in stack):
+        return "pylive"
+    if thread_name in THREAD_SUBSYSTEMS:
+        return THREAD_SUBSYSTEMS[thread_name]
+    if any(f"{os.sep}StreamDeck{os.sep}" in filename for _, filename, _ in stack):
+        return "deck-reader"
+    return "other"
+
+
+class SamplingProfiler:
+    """
+    Samples the stacks of every thread at a fixed interval while enabled.
+
+    Samples are aggregated into counts per (subsystem, thread, stack), so memory
+    stays bounded by the number of distinct stacks rather than the duration.
+    Stopping writes a collapsed-stack file (for flamegraph.pl / inferno) and a
+    speedscope JSON file into PROFILES_PATH.
+    """
+
+    def __init__(self, interval=SAMPLE_INTERVAL, output_dir=PROFILES_PATH, name="profile"):
+        """
+        Args:
+            interval (float): Seconds between samples.
+            output_dir (str): Directory the profile files are written to.
+            name (str): File name prefix, e.g. "router-profile" for the MIDI router process.
+        """
+        self.interval = interval
+        self.output_dir = output_dir
+        self.name = name
+        self.samples = Counter()
+        self.started_at = None
+        self.sampler_cpu = 0.0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    def toggle(self):
+        """Starts profiling, or stops it and writes the profile. Returns the written paths."""
+        with self._lock:
+            if self._thread is None:
+                self._start()
+                return []
+            return self._stop_and_write()
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._start()
+
+    def stop(self):
+        """Stops profiling and writes the profile files. Returns their paths."""
+        with self._lock:
+            if self._thread is None:
+                return []
+            return self._stop_and_write()
+
+    def _start(self):
+        self.samples = Counter()
+        self.sampler_cpu = 0.0
+        self.started_at = time.time()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        logging.info("Sampling profiler started (%.0f Hz)", 1 / self.interval)
+
+    def _stop_and_write(self):
+        self._stop.set()
+        self._thread.join(timeout=2)
+        self._thread = None
+        duration = time.time() - self.started_at
+        total = sum(self.samples.values())
+        logging.info("Sampling profiler stopped: %d samples over %.1fs, sampler used %.1f%% of a core",
+                     total, duration, self.sampler_cpu / duration * 100 if duration else 0.0)
+        return self.write(duration)
+
+    def _run(self):
+        own_ident = threading.get_ident()
+        cpu_started = time.thread_time()
+        next_sample = time.perf_counter()
+        while not self._stop.is_set():
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own_ident:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append((code.co_name, code.co_filename, code.co_firstlineno))
+                    frame = frame.f_back
+                stack.reverse()
+                thread_name = names.get(ident, f"thread-{ident}")
+                self.samples[(subsystem_for(thread_name, stack), thread_name, tuple(stack))] += 1
+            next_sample += self.interval
+            delay = next_sample - time.perf_counter()
+            if delay < 0:
+                next_sample = time.perf_counter()
+                delay = 0
+            self._stop.wait(delay)
+        self.sampler_cpu = time.thread_time() - cpu_started
+
+    @staticmethod
+    def _frame_label(frame):
+        name, filename, line = frame
+        return f"{name} ({os.path.basename(filename)}:{line})"
+
+    def write(self, duration):
+        """Writes the collected samples as collapsed stacks and speedscope JSON."""
+        os.makedirs(self.output_dir, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(self.started_at))
+        collapsed_path = os.path.join(self.output_dir, f"{self.name}-{stamp}.collapsed")
+        speedscope_path = os.path.join(self.output_dir, f"{self.name}-{stamp}.speedscope.json")
+
+        with open(collapsed_path, "w") as file:
+            for (subsystem, thread_name, stack), count in sorted(self.samples.items()):
+                labels = [subsystem, thread_name] + [self._frame_label(frame) for frame in stack]
+                file.write(";".join(label.replace(";", ":") for label in labels) + f" {count}\n")
+
+        frames, frame_index = [], {}
+        profiles = {}
+        for (subsystem, thread_name, stack), count in self.samples.items():
+            indices = []
+            for frame in stack:
+                if frame not in frame_index:
+                    frame_index[frame] = len(frames)
+                    frames.append({"name": frame[0], "file": frame[1], "line": frame[2]})
+                indices.append(frame_index[frame])
+            profile = profiles.setdefault((subsystem, thread_name), {"samples": [], "weights": []})
+            profile["samples"].append(indices)
+            profile["weights"].append(count * self.interval)
+        document = {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": f"LiveDeck {stamp}",
+            "exporter": "LiveDeck profiler",
+            "shared": {"frames": frames},
+            "profiles": [
+                {
+                    "type": "sampled",
+                    "name": f"{subsystem} / {thread_name}",
+                    "unit": "seconds",
+                    "startValue": 0,
+                    "endValue": duration,
+                    "samples": profile["samples"],
+                    "weights": profile["weights"],
+                }
+                for (subsystem, thread_name), profile in sorted(profiles.items())
+            ],
+        }
+        with open(speedscope_path, "w") as file:
+            json.dump(document, file)
+
+        logging.info("Wrote profile to %s and %s", collapsed_path, speedscope_path)
+        return [collapsed_path, speedscope_path]
+
+
+# Create global instance
+profiler = SamplingProfiler()
+_toggle_listeners = []
+_toggle_requested = threading.Event()
+
+
+def add_toggle_listener(listener):
+    """
+    Registers a callable(running) told whenever toggle_profiling() starts or
+    stops the global profiler, e.g. to profile the MIDI router process
+    (see router.py) over the same period.
+    """
+    _toggle_listeners.append(listener)
+
+
+def toggle_profiling(*_):
+    """Starts or stops the global profiler. Usable as an OSC handler; see install_signal_handler() for signals."""
+    paths = profiler.toggle()
+    for listener in _toggle_listeners:
+        try:
+            listener(profiler.running)
+        except Exception as e:
+            logging.warning("Profiler toggle listener failed: %s", e)
+    return paths
+
+
+def _request_toggle(*_):
+    # The handler runs on the main thread between bytecodes, possibly while it holds
+    # the profiler's lock or is writing a profile, so it only wakes the toggle thread
+    _toggle_requested.set()
+
+
+def _toggle_worker():
+    while True:
+        _toggle_requested.wait()
+        _toggle_requested.clear()
+        try:
+            toggle_profiling()
+        except Exception as e:
+            logging.error("Could not toggle the profiler: %s", e)
+
+
+def install_signal_handler(signum=getattr(signal, "SIGUSR1", None)):
+    """
+    Makes a signal (SIGUSR1 by default) toggle the global profiler. The work is
+    done on a "profiler-toggle" thread, never inside the signal handler.
+    Returns False if the platform has no such signal.
+    """
+    if signum is None:
+        return False
+    threading.Thread(target=_toggle_worker, name="profiler-toggle", daemon=True).start()
+    signal.signal(signum, _request_toggle)
+    return True
@@ -0,0 +1,179 @@
+# --- progress.py ---
+
+import time
+import logging
+import threading
+from collections import deque
+from StreamDeck.ImageHelpers import PILHelper
+from config import PLAYHEAD_FPS
+from utils import percentile
+
+STRIP_HEIGHT = 4
+STRIP_COLOR = (30, 144, 255)
+STRIP_BACKGROUND = (40, 40, 40)
+
+
+class PlayheadProgress:
+    """
+    Draws a playhead progress strip along the bottom of the playing song's key.
+
+    Positions arrive from Max for Live over OSC at whatever rate it sends them.
+    A render thread picks up the latest one at most `fps` times a second,
+    composites only the strip onto a cached base image of the key, and pushes the
+    frame only if the strip actually changed. Frames are dropped, never queued:
+    when the deck is busy with key-press feedback, the key shows a press
+    highlight, or a frame overruns its budget, the next frame simply shows the
+    newer position.
+    """
+
+    def __init__(self, controller, deck, fps=PLAYHEAD_FPS):
+        """
+        Args:
+            controller: The Controller owning the deck (provides playing song, page and deck lock).
+            deck: The Stream Deck device.
+            fps (float): Maximum frames per second pushed to the key.
+        """
+        self.controller = controller
+        self.deck = deck
+        self.fps = fps
+        self.frame_budget = 1.0 / fps
+        self.position = 0.0
+
+        self._song_index = None
+        self._base = None
+        self._drawn_width = None
+        self._stop = threading.Event()
+        self._thread = None
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.frames = 0
+        self.skipped_busy = 0
+        self.skipped_over_budget = 0
+        self.frame_cpu = deque(maxlen=1000)
+        self.frame_wall = deque(maxlen=1000)
+
+    def start(self):
+        """Starts the render thread."""
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="playhead-progress", daemon=True)
+            self._thread.start()
+            logging.info("Playhead progress running at %s fps", self.fps)
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+            self._thread = None
+
+    def handle_osc(self, address, *args):
+        """
+        OSC handler for playhead updates: either (fraction) or (position, length).
+        """
+        try:
+            if len(args) >= 2 and args[1]:
+                fraction = float(args[0]) / float(args[1])
+            elif args:
+                fraction = float(args[0])
+            else:
+                return
+        except (TypeError, ValueError):
+            logging.warning("Ignoring malformed playhead message: %s %s", address, args)
+            return
+        self.position = min(1.0, max(0.0, fraction))
+
+    def invalidate(self):
+        """Forces the strip to be redrawn, e.g. after the key was repainted."""
+        self._drawn_width = None
+
+    def _run(self):
+        next_frame = time.perf_counter()
+        while not self._stop.is_set():
+            next_frame += self.frame_budget
+            try:
+                self.render_frame()
+            except Exception as e:
+                logging.error("Playhead progress frame failed: %s", e)
+            now = time.perf_counter()
+            if now > next_frame:
+                # Over budget: drop the missed frames instead of catching up
+                missed = int((now - next_frame) / self.frame_budget) + 1
+                self.skipped_over_budget += missed
+                next_frame += missed * self.frame_budget
+            self._stop.wait(next_frame - now)
+
+    def render_frame(self):
+        """
+        Renders and pushes one frame if the strip changed.
+
+        Returns:
+            bool: True if a frame was pushed to the deck.
+        """
+        controller = self.controller
+        song_index = controller.playing_song_index
+        key = controller.visible_key(song_index)
+        if key is None:
+            self._drawn_width = None
+            return False
+        # A press highlight stays up until its intent has been applied and the key repainted
+        if key in controller.acknowledged_keys:
+            self.skipped_busy += 1
+            return False
+
+        if song_index != self._song_index or self._base is None:
+            # Drawn over the key as displayed, not re-composed from the full-size artwork
+            self._base = controller.displayed_button(self.deck, controller.song_data[song_index])
+            self._song_index = song_index
+            self._drawn_width = None
+
+        width = round(self.position * self._base.width)
+        if width == self._drawn_width:
+            return False
+
+        started_cpu = time.thread_time()
+        started_wall = time.perf_counter()
+        frame = self._base.copy()
+        top = frame.height - STRIP_HEIGHT
+        frame.paste(STRIP_BACKGROUND, (0, top, frame.width, frame.height))
+        if width:
+            frame.paste(STRIP_COLOR, (0, top, width, frame.height))
+        native_img = PILHelper.to_native_key_format(self.deck, frame)
+
+        # Key-press feedback owns the deck; never wait for it
+        if not controller.deck_lock.acquire(blocking=False):
+            self.skipped_busy += 1
+            return False
+        try:
+            # The page or song may have changed, or the key been pressed, while we rendered
+            if controller.playing_song_index != song_index or controller.visible_key(song_index) != key:
+                return False
+            if key in controller.acknowledged_keys:
+                self.skipped_busy += 1
+                return False
+            self.deck.set_key_image(key, native_img)
+            self._drawn_width = width
+        finally:
+            controller.deck_lock.release()
+
+        self.frames += 1
+        self.frame_cpu.append(time.thread_time() - started_cpu)
+        self.frame_wall.append(time.perf_counter() - started_wall)
+        return True
+
+    def stats(self):
+        """
+        Returns frame counts and per-frame cost in milliseconds.
+        """
+        cpu = list(self.frame_cpu)
+        wall = list(self.frame_wall)
+        return {
+            "fps": self.fps,
+            "frames": self.frames,
+            "skipped_busy": self.skipped_busy,
+            "skipped_over_budget": self.skipped_over_budget,
+            "cpu_ms_p50": percentile(cpu, 50) * 1000,
+            "cpu_ms_p99": percentile(cpu, 99) * 1000,
+            "wall_ms_p50": percentile(wall, 50) * 1000,
+            "wall_ms_p99": percentile(wall, 99) * 1000,
+        }
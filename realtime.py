@@ -0,0 +1,196 @@
+# --- realtime.py ---
+
+import gc
+import os
+import sys
+import time
+import logging
+import threading
+from collections import deque
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+
+GC_PAUSE_THRESHOLD = 0.002   # Log collections that stop the world for longer than this (seconds)
+IDLE_QUIET = 0.25            # No MIDI or key activity for this long counts as idle (seconds)
+IDLE_CHECK_INTERVAL = 0.05   # How often the idle collector looks for a quiet moment (seconds)
+SHOW_GC_THRESHOLDS = (700, 1000, 1000)  # Young collections stay automatic; older ones wait for idle time
+FULL_COLLECT_EVERY = 20      # Every Nth idle collection also sweeps the oldest generation
+
+# Threads on the performance path that get a scheduling boost in show mode
+HOT_THREAD_NAMES = ("midi-forward", "midi-clock", "intent-worker")
+RT_PRIORITY = 10             # SCHED_RR priority on Linux when permitted
+NICE_BOOST = -10             # Per-thread nice value on Linux otherwise
+
+_last_activity = time.monotonic()
+_activity_sources = []
+
+
+def mark_activity():
+    """Records MIDI or key activity; the idle collector waits for a quiet moment after it."""
+    global _last_activity
+    _last_activity = time.monotonic()
+
+
+def add_activity_source(source):
+    """
+    Registers a callable returning the time.monotonic() of activity seen
+    elsewhere, e.g. MIDI handled by the router process (see router.py).
+    """
+    _activity_sources.append(source)
+
+
+def last_activity():
+    """Returns the time.monotonic() of the latest activity from any source."""
+    latest = _last_activity
+    for source in _activity_sources:
+        try:
+            latest = max(latest, source())
+        except Exception:
+            pass
+    return latest
+
+
+def raise_thread_priority(thread):
+    """
+    Raises a thread's scheduling priority where the OS allows it.
+
+    On Linux, threads can be scheduled individually: SCHED_RR is tried first
+    (needs CAP_SYS_NICE or an rtprio limit), then a negative nice value.
+    Other platforms have no per-thread priority API in the standard library.
+
+    Returns:
+        str: The policy applied, or None if the priority could not be raised.
+    """
+    tid = thread.native_id
+    if tid is None or not sys.platform.startswith("linux"):
+        return None
+    try:
+        os.sched_setscheduler(tid, os.SCHED_RR, os.sched_param(RT_PRIORITY))
+        return f"SCHED_RR {RT_PRIORITY}"
+    except (PermissionError, OSError):
+        pass
+    try:
+        os.setpriority(os.PRIO_PROCESS, tid, NICE_BOOST)
+        return f"nice {NICE_BOOST}"
+    except (PermissionError, OSError):
+        return None
+
+
+class ShowMode:
+    """
+    Keeps CPython's expensive garbage collections off the performance path.
+
+    Enabling it collects once and freezes everything alive after startup (song
+    data, cached images, fonts, pylive objects) into the permanent generation,
+    so later collections never traverse it. Young-generation collections stay
+    automatic since they only scan the last few hundred allocations; the older
+    generations get thresholds high enough that they are instead collected by
+    an idle thread whenever MIDI and keys have been quiet for IDLE_QUIET
+    seconds. The raised thresholds still act as a backstop during a long busy
+    passage. Every collection over the pause threshold is logged.
+    """
+
+    def __init__(self, pause_threshold=GC_PAUSE_THRESHOLD, idle_quiet=IDLE_QUIET):
+        self.pause_threshold = pause_threshold
+        self.idle_quiet = idle_quiet
+        self.enabled = False
+        self.pauses = deque(maxlen=1000)   # (generation, seconds)
+        self.slow_pauses = 0
+        self.idle_collections = 0
+        self._saved_thresholds = None
+        self._gc_started = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def enable(self, threads=()):
+        """
+        Freezes startup objects, defers GC to idle periods and boosts hot threads.
+
+        Args:
+            threads: Extra threads to boost besides those named in HOT_THREAD_NAMES
+                (e.g. the Stream Deck library's reader thread).
+        """
+        if self.enabled:
+            return
+        started = time.perf_counter()
+        gc.collect()
+        gc.freeze()
+        self._saved_thresholds = gc.get_threshold()
+        gc.set_threshold(*SHOW_GC_THRESHOLDS)
+        gc.callbacks.append(self._on_gc)
+        self.enabled = True
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._idle_collector, name="gc-idle", daemon=True)
+        self._thread.start()
+        logging.info("Show mode: froze %d objects in %.1f ms, older GC generations deferred to idle periods",
+                     gc.get_freeze_count(), (time.perf_counter() - started) * 1000)
+
+        hot = [t for t in threading.enumerate() if t.name in HOT_THREAD_NAMES]
+        for thread in hot + list(threads):
+            self.adopt(thread)
+
+    def adopt(self, thread):
+        """
+        Boosts a performance-path thread started after show mode was enabled
+        (the intent worker, or a reconnected deck's reader). No-op otherwise.
+        """
+        if not self.enabled or thread is None:
+            return
+        policy = raise_thread_priority(thread)
+        if policy:
+            logging.info("Show mode: %s thread raised to %s", thread.name, policy)
+        else:
+            logging.info("Show mode: can't raise %s thread priority on this system", thread.name)
+
+    def disable(self):
+        """Restores automatic garbage collection."""
+        if not self.enabled:
+            return
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+            self._thread = None
+        gc.callbacks.remove(self._on_gc)
+        gc.set_threshold(*self._saved_thresholds)
+        gc.unfreeze()
+        self.enabled = False
+        logging.info("Show mode disabled")
+
+    def _on_gc(self, phase, info):
+        if phase == "start":
+            self._gc_started = time.perf_counter()
+            return
+        if self._gc_started is None:
+            return
+        pause = time.perf_counter() - self._gc_started
+        self._gc_started = None
+        self.pauses.append((info["generation"], pause))
+        if pause > self.pause_threshold:
+            self.slow_pauses += 1
+            logging.warning("GC pause %.1f ms (generation %d, %d collected) on %s thread",
+                            pause * 1000, info["generation"], info["collected"],
+                            threading.current_thread().name)
+
+    def _idle_collector(self):
+        while not self._stop.wait(IDLE_CHECK_INTERVAL):
+            if time.monotonic() - last_activity() < self.idle_quiet:
+                continue
+            # get_count()[1] counts young collections since generation 1 was last collected
+            if gc.get_count()[1] == 0:
+                continue
+            self.idle_collections += 1
+            gc.collect(2 if self.idle_collections % FULL_COLLECT_EVERY == 0 else 1)
+
+    def stats(self):
+        """Returns collection counts and the worst recorded pauses in milliseconds."""
+        pauses = [pause for _, pause in self.pauses]
+        return {
+            "collections": len(pauses),
+            "idle_collections": self.idle_collections,
+            "slow_pauses": self.slow_pauses,
+            "max_pause_ms": max(pauses, default=0.0) * 1000,
+        }
+
+
+# Create global instance
+show_mode = ShowMode()
@@ -0,0 +1,220 @@
+# --- recorder.py ---
+
+import os
+import mmap
+import time
+import struct
+import logging
+import argparse
+import threading
+from collections import Counter
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+
+# File layout (little endian):
+#   header: magic "LDMR", version u8, port count u8, then per port: name length u8 + UTF-8 name
+#   records: timestamp in microseconds since recording start u64, port index u8,
+#            data length u16, then the raw MIDI bytes
+MAGIC = b"LDMR"
+VERSION = 1
+HEADER = struct.Struct("<4sBB")
+RECORD = struct.Struct("<QBH")
+FLUSH_INTERVAL = 1.0        # Seconds between buffer flushes to disk
+FLUSH_SIZE = 64 * 1024      # Flush early once the buffer holds this many bytes
+
+RECORDINGS_PATH = "recordings"
+
+
+class MidiRecorder:
+    """
+    Appends timestamped raw MIDI messages to a compact binary session file.
+
+    Messages are packed straight into a bytearray and a background thread swaps
+    it out and writes it to disk, so memory stays flat however long the session runs.
+    """
+
+    def __init__(self, path, port_names, clock=time.perf_counter):
+        """
+        Args:
+            path (str): File to write. Parent directories are created.
+            port_names (list): Input port names; records refer to them by index.
+            clock (callable): Monotonic time source in seconds.
+        """
+        self.path = path
+        self.port_names = list(port_names)
+        self.clock = clock
+        self.count = 0
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._file = open(path, "wb")
+        self._file.write(HEADER.pack(MAGIC, VERSION, len(self.port_names)))
+        for name in self.port_names:
+            encoded = name.encode("utf-8")[:255]
+            self._file.write(bytes([len(encoded)]) + encoded)
+
+        self._start = clock()
+        self._buffer = bytearray()
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._flush_wake = threading.Event()
+        self._writer = threading.Thread(target=self._write_loop, name="midi-recorder", daemon=True)
+        self._writer.start()
+
+    def record(self, port_index, data, timestamp=None):
+        """
+        Appends one message.
+
+        Args:
+            port_index (int): Index of the input port in port_names.
+            data: Raw MIDI bytes (bytes, bytearray or list of ints).
+            timestamp (float, optional): Receive time from the recorder's clock; defaults to now.
+        """
+        if timestamp is None:
+            timestamp = self.clock()
+        micros = max(0, int((timestamp - self._start) * 1e6))
+        with self._lock:
+            self._buffer += RECORD.pack(micros, port_index, len(data))
+            self._buffer += bytes(data)
+            self.count += 1
+            if len(self._buffer) >= FLUSH_SIZE:
+                self._flush_wake.set()
+
+    def _swap_and_write(self):
+        with self._lock:
+            if not self._buffer:
+                return
+            pending, self._buffer = self._buffer, bytearray()
+        self._file.write(pending)
+        self._file.flush()
+
+    def _write_loop(self):
+        while not self._closed.is_set():
+            self._flush_wake.wait(FLUSH_INTERVAL)
+            self._flush_wake.clear()
+            self._swap_and_write()
+
+    def close(self):
+        """Flushes remaining messages and closes the file."""
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        self._flush_wake.set()
+        self._writer.join(timeout=2)
+        self._swap_and_write()
+        self._file.close()
+
+
+def session_path(directory=RECORDINGS_PATH):
+    """Returns a timestamped file path for a new session recording."""
+    return os.path.join(directory, time.strftime("session-%Y%m%d-%H%M%S.ldmr"))
+
+
+def read_header(data):
+    """
+    Parses a recording header.
+
+    Returns:
+        tuple: (port_names, offset of the first record)
+    """
+    magic, version, port_count = HEADER.unpack_from(data, 0)
+    if magic != MAGIC:
+        raise ValueError("Not a LiveDeck MIDI recording")
+    if version != VERSION:
+        raise ValueError(f"Unsupported recording version: {version}")
+    offset = HEADER.size
+    port_names = []
+    for _ in range(port_count):
+        length = data[offset]
+        port_names.append(bytes(data[offset + 1:offset + 1 + length]).decode("utf-8"))
+        offset += 1 + length
+    return port_names, offset
+
+
+def iter_recording(path):
+    """
+    Yields the messages of a recording without loading it into memory.
+
+    Yields:
+        tuple: (seconds since recording start, port index, raw MIDI bytes)
+    """
+    with open(path, "rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            _, offset = read_header(data)
+            end = len(data)
+            while offset + RECORD.size <= end:
+                micros, port_index, length = RECORD.unpack_from(data, offset)
+                offset += RECORD.size
+                if offset + length > end:
+                    logging.warning("Truncated record at end of %s", path)
+                    break
+                yield micros / 1e6, port_index, data[offset:offset + length]
+                offset += length
+
+
+def replay(path, handler, speed=1.0):
+    """
+    Feeds a recording back through a message handler.
+
+    Args:
+        path (str): Recording to play.
+        handler (callable): Called as handler(port_index, data) for every message,
+            e.g. a wrapper around midi.route_bytes.
+        speed (float): Playback rate; 1.0 is real time, 2.0 twice as fast,
+            0 replays as fast as possible.
+
+    Returns:
+        int: Number of messages replayed.
+    """
+    count = 0
+    start = time.perf_counter()
+    for timestamp, port_index, data in iter_recording(path):
+        if speed > 0:
+            delay = start + timestamp / speed - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        handler(port_index, data)
+        count += 1
+    return count
+
+
+def summarize(path):
+    """Returns message counts and duration of a recording."""
+    with open(path, "rb") as file:
+        port_names, _ = read_header(file.read(HEADER.size + 255 * 256))
+    per_port = Counter()
+    duration = 0.0
+    for timestamp, port_index, _ in iter_recording(path):
+        per_port[port_index] += 1
+        duration = timestamp
+    return {
+        "messages": sum(per_port.values()),
+        "duration_s": duration,
+        "ports": {port_names[i] if i < len(port_names) else str(i): n for i, n in per_port.items()},
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect or replay LiveDeck MIDI session recordings")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    info_parser = subparsers.add_parser("info", help="Show message counts and duration")
+    info_parser.add_argument("path")
+    replay_parser = subparsers.add_parser("replay", help="Replay a recording through the MIDI router")
+    replay_parser.add_argument("path")
+    replay_parser.add_argument("--speed", type=float, default=1.0, help="Playback rate (0 = as fast as possible)")
+    args = parser.parse_args()
+
+    if args.command == "info":
+        print(summarize(args.path))
+    else:
+        import midi
+        midi.open_output()
+
+        def route(port_index, data):
+            midi.route_bytes(data)
+
+        started = time.perf_counter()
+        replayed = replay(args.path, route, args.speed)
+        elapsed = time.perf_counter() - started
+        logging.info("Replayed %d messages in %.2fs (%.0f msg/s)", replayed, elapsed, replayed / elapsed if elapsed else 0)
@@ -0,0 +1,290 @@
+# --- router.py ---
+
+import os
+import sys
+import mmap
+import time
+import signal
+import struct
+import logging
+import argparse
+import tempfile
+import threading
+import subprocess
+import backends
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+
+BASE_DIR = os.path.abspath(os.path.dirname(__file__))
+
+# Shared stats block (little endian), rewritten by the router every STATS_INTERVAL:
+#   sequence u64 (odd while a write is in progress), then received u64, forwarded u64,
+#   ignored u64 and the time.monotonic() of the last message f64
+SEQUENCE = struct.Struct("<Q")
+COUNTERS = struct.Struct("<QQQd")
+STATS_SIZE = SEQUENCE.size + COUNTERS.size
+STATS_INTERVAL = 0.05         # Seconds between stats updates from the router
+ROUTER_POLL_INTERVAL = 0.002  # The router has a process to itself, so it can afford to poll often
+STOP_TIMEOUT = 2.0            # Seconds to wait for the router to exit before killing it
+RESTART_BACKOFF = 1.0         # Seconds before the first restart of a crashed router; doubles per crash
+RESTART_BACKOFF_MAX = 60.0    # Longest wait between restarts
+MAX_RESTARTS = 8              # Consecutive crashes before giving up on the router
+STABLE_RUN = 60.0             # A router that ran this long resets the crash count
+
+# tmpfs where available, so the stats block never touches a disk
+SHM_DIR = "/dev/shm" if os.path.isdir("/dev/shm") else None
+
+
+class MidiRouterProcess:
+    """
+    Runs the MIDI router (midi.forward_midi) in a separate, lightweight process.
+
+    In a thread, forwarding competes for the GIL with key rendering, the info bar
+    and pylive; in its own process it only imports the MIDI modules. Commands
+    (listen range, port changes, profiling) go to the router as text lines on
+    its stdin, and it publishes message counters into a shared-memory block
+    that stats() reads without a round trip. The router exits when its stdin closes, so it
+    never outlives the app.
+    """
+
+    def __init__(self, listen_range=None, record=False, show=False, command=None):
+        """
+        Args:
+            listen_range (tuple): (low, high) notes to forward; the router's default if None.
+            record (bool): Record the MIDI session from inside the router (see recorder.py).
+            show (bool): Put the router process in show mode (see realtime.py).
+            command (list): Program to run instead of this module, e.g. a benchmark harness.
+        """
+        self.listen_range = listen_range
+        self.record = record
+        self.show = show
+        self.command = command or [sys.executable, os.path.join(BASE_DIR, "router.py")]
+        self.process = None
+        self.restarts = 0
+        self.failures = 0          # Consecutive crashes, see ensure_running()
+        self.gave_up = False
+        self._started_at = None
+        self._next_restart = None
+        self._stats_fd = None
+        self._stats = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Creates the shared stats block and starts the router process."""
+        if self.process is not None:
+            return
+        # The file is unlinked at once; the mapping lives on through the descriptor passed to the router
+        fd, path = tempfile.mkstemp(prefix="livedeck-router-", dir=SHM_DIR)
+        os.unlink(path)
+        os.ftruncate(fd, STATS_SIZE)
+        self._stats_fd = fd
+        self._stats = mmap.mmap(fd, STATS_SIZE)
+        self._spawn()
+
+    def _spawn(self):
+        argv = self.command + ["--stats-fd", str(self._stats_fd)]
+        if self.listen_range is not None:
+            argv += ["--range", str(self.listen_range[0]), str(self.listen_range[1])]
+        if self.record:
+            argv.append("--record")
+        if self.show:
+            argv.append("--show")
+        env = dict(os.environ, LIVEDECK_BACKEND=backends.current().name)
+        self._stats[:] = bytes(STATS_SIZE)
+        self.process = subprocess.Popen(argv, stdin=subprocess.PIPE, text=True, cwd=BASE_DIR, env=env,
+                                        pass_fds=(self._stats_fd,))
+        self._started_at = time.monotonic()
+        logging.info("MIDI router running in process %d", self.process.pid)
+
+    def running(self):
+        return self.process is not None and self.process.poll() is None
+
+    def ensure_running(self):
+        """
+        Restarts the router if it exited. Returns True if it had to be restarted.
+
+        Restarts back off from RESTART_BACKOFF seconds, doubling after each
+        crash, and stop altogether after MAX_RESTARTS crashes in a row, so a
+        router that dies on startup (e.g. a missing port) doesn't respawn forever.
+        """
+        if self.process is None or self.gave_up or self.running():
+            return False
+        now = time.monotonic()
+        if self._next_restart is None:
+            # First look at this crash
+            if now - self._started_at >= STABLE_RUN:
+                self.failures = 0
+            self.failures += 1
+            if self.failures > MAX_RESTARTS:
+                self.gave_up = True
+                logging.error("MIDI router exited with code %s after %d restarts in a row; giving up",
+                              self.process.returncode, MAX_RESTARTS)
+                return False
+            delay = min(RESTART_BACKOFF * 2 ** (self.failures - 1), RESTART_BACKOFF_MAX)
+            self._next_restart = now + delay
+            logging.warning("MIDI router exited with code %s; restarting in %.1fs",
+                            self.process.returncode, delay)
+        if now < self._next_restart:
+            return False
+        self._next_restart = None
+        self.restarts += 1
+        self._spawn()
+        return True
+
+    def stop(self, timeout=STOP_TIMEOUT):
+        """Asks the router to exit by closing its stdin, and releases the stats block."""
+        if self.process is None:
+            return
+        with self._lock:
+            try:
+                self.process.stdin.close()
+            except OSError:
+                pass
+        try:
+            self.process.wait(timeout)
+        except subprocess.TimeoutExpired:
+            logging.warning("MIDI router did not exit; killing it")
+            self.process.kill()
+            self.process.wait()
+        self.process = None
+        self._stats.close()
+        os.close(self._stats_fd)
+        self._stats = None
+        self._stats_fd = None
+
+    def _send(self, line):
+        with self._lock:
+            if not self.running():
+                logging.warning("MIDI router not running; dropped command: %s", line)
+                return
+            try:
+                self.process.stdin.write(line + "\n")
+                self.process.stdin.flush()
+            except OSError as e:
+                logging.warning("Could not send command to MIDI router: %s", e)
+
+    def set_listen_range(self, low, high):
+        self.listen_range = (low, high)
+        self._send(f"range {low} {high}")
+
+    def notify_ports_changed(self):
+        """Makes the router reopen its input ports."""
+        self._send("ports")
+
+    def reopen_output(self):
+        """Makes the router reopen its output port after the device came back."""
+        self._send("reopen")
+
+    def set_profiling(self, running):
+        """
+        Starts or stops the sampling profiler inside the router, which the app's
+        profiler can't see. A profiler toggle listener (see profiler.py).
+        """
+        self._send("profile on" if running else "profile off")
+
+    def stats(self):
+        """Returns the router's latest message counters."""
+        if self._stats is None:
+            return None
+        # Retry while the router is mid-update; give up on a torn read if it died mid-write
+        for _ in range(100):
+            sequence, = SEQUENCE.unpack_from(self._stats, 0)
+            received, forwarded, ignored, last_message = COUNTERS.unpack_from(self._stats, SEQUENCE.size)
+            if sequence % 2 == 0 and SEQUENCE.unpack_from(self._stats, 0)[0] == sequence:
+                break
+            time.sleep(0)
+        return {
+            "pid": self.process.pid if self.process else None,
+            "restarts": self.restarts,
+            "gave_up": self.gave_up,
+            "received": received,
+            "forwarded": forwarded,
+            "ignored": ignored,
+            "last_message": last_message,
+        }
+
+    def last_activity(self):
+        """time.monotonic() of the last message the router saw; an activity source for realtime.py."""
+        stats = self.stats()
+        return stats["last_message"] if stats else 0.0
+
+
+def _publish_stats(stats_map, stop):
+    """Copies midi.stats into the shared block until stopped. Runs in the router process."""
+    import midi
+    sequence = 0
+    while not stop.wait(STATS_INTERVAL):
+        stats = midi.stats
+        SEQUENCE.pack_into(stats_map, 0, sequence + 1)
+        COUNTERS.pack_into(stats_map, SEQUENCE.size, stats["received"], stats["forwarded"],
+                           stats["ignored"], stats["last_message"])
+        sequence += 2
+        SEQUENCE.pack_into(stats_map, 0, sequence)
+
+
+def serve(stats_fd, listen_range=None, record=False, show=False, control=sys.stdin):
+    """
+    Runs the router: forwards MIDI in a thread and applies commands from
+    `control` until it reaches EOF.
+    """
+    import midi
+    from recorder import session_path
+    from realtime import show_mode
+    from profiler import SamplingProfiler
+
+    # Ctrl+C reaches the whole process group; the app decides when the router stops
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    midi.POLL_INTERVAL = ROUTER_POLL_INTERVAL
+    if listen_range is not None:
+        midi.set_listen_range(*listen_range)
+    if record:
+        midi.start_recording(os.path.join(BASE_DIR, session_path()))
+    threading.Thread(target=midi.forward_midi, name="midi-forward", daemon=True).start()
+
+    stats_map = mmap.mmap(stats_fd, STATS_SIZE)
+    stop = threading.Event()
+    publisher = threading.Thread(target=_publish_stats, args=(stats_map, stop), name="router-stats", daemon=True)
+    publisher.start()
+    profiler = SamplingProfiler(name="router-profile")
+    if show:
+        show_mode.enable()
+
+    for line in control:
+        command, *params = line.split() or [""]
+        try:
+            if command == "range":
+                midi.set_listen_range(int(params[0]), int(params[1]))
+            elif command == "ports":
+                midi.notify_ports_changed()
+            elif command == "reopen":
+                midi.reopen_output()
+            elif command == "profile":
+                if params[0] == "on":
+                    profiler.start()
+                else:
+                    profiler.stop()
+            else:
+                logging.warning("Unknown MIDI router command: %s", line.strip())
+        except Exception as e:
+            logging.error("MIDI router command %r failed: %s", line.strip(), e)
+
+    logging.info("MIDI router stopping")
+    stop.set()
+    publisher.join(timeout=1)
+    profiler.stop()
+    midi.stop_recording()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="LiveDeck MIDI router process (started by main.py)")
+    parser.add_argument("--stats-fd", type=int, required=True, help="Descriptor of the shared stats block")
+    parser.add_argument("--range", type=int, nargs=2, metavar=("LOW", "HIGH"), help="Notes to forward")
+    parser.add_argument("--record", action="store_true", help="Record the MIDI session")
+    parser.add_argument("--show", action="store_true", help="Enable show mode (see realtime.py)")
+    args = parser.parse_args(argv)
+    serve(args.stats_fd, args.range, args.record, args.show)
+
+
+if __name__ == "__main__":
+    main()
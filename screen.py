@@ -2,8 +2,9 @@ import os
 import sys
 import time
 from time import localtime, strftime
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image, ImageDraw
 from StreamDeck.ImageHelpers import PILHelper
+from utils import load_font
 
 ASSETS_PATH = os.path.join(os.path.dirname(__file__), "Assets")
 
@@ -41,10 +42,10 @@ class InfoBar:
         self.time_font_size = time_font_size
         self.box_font_size = box_font_size
 
-        self.time_font = ImageFont.truetype(
+        self.time_font = load_font(
             os.path.join(ASSETS_PATH, "DepartureMono-Regular.otf"), self.time_font_size
         )
-        self.box_font = ImageFont.truetype(
+        self.box_font = load_font(
             os.path.join(ASSETS_PATH, "DepartureMono-Regular.otf"), self.box_font_size
         )
 
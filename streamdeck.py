@@ -7,8 +7,10 @@ import psutil
 import time
 import platform
 import subprocess
+import threading
 from PIL import Image, ImageDraw, ImageFont
-from StreamDeck.DeviceManager import DeviceManager
+import backends
+from StreamDeck.Transport.Transport import TransportError
 from StreamDeck.ImageHelpers import PILHelper
 from config import SONG_DB_PATH, load_json
 
@@ -76,25 +78,139 @@ def initialize_streamdeck():
     """Initialize StreamDeck by closing any running instance and starting a new one."""
     logging.info("Starting StreamDeck initialization...")
     
-    # Close StreamDeck app
-    close_streamdeck_app()
+    backend = backends.current()
+
+    # Close StreamDeck app (only the real device can be claimed by it)
+    if backend.name == "hardware":
+        close_streamdeck_app()
 
     # Initialize device
-    manager = DeviceManager()
-    streamdecks = manager.enumerate()
+    device = open_streamdeck()
+    if not device:
+        return None
+    # Remove the call to update_buttons here.
+    # The main program should call controller.update_buttons(deck)
+    logging.info("Stream Deck initialized successfully")
+    return DeckHandle(device)
+
+
+def open_streamdeck(warn_missing=True):
+    """
+    Open the first connected Stream Deck, or return None if there is none.
+
+    Args:
+        warn_missing (bool): Log a warning when no deck is found. The device
+            supervisor retries quietly, having logged the loss once.
+    """
+    streamdecks = backends.current().enumerate_decks()
     if not streamdecks:
-        logging.warning("No Stream Deck devices found.")
+        if warn_missing:
+            logging.warning("No Stream Deck devices found.")
         return None
 
     deck = streamdecks[0]
     deck.open()
     logging.info(f"Connected to Stream Deck: {deck.deck_type()}")
-    # Remove the call to update_buttons here.
-    # The main program should call controller.update_buttons(deck)
-    logging.info("Stream Deck initialized successfully")
     return deck
 
 
+class DeckHandle:
+    """
+    Stable stand-in for the connected Stream Deck that survives reconnects.
+
+    It remembers the last image or colour pushed to every key and the screen,
+    so a replacement device can be restored from that framebuffer without
+    re-rendering. While no device is attached, writes only update the
+    framebuffer. Everything else is delegated to the current device.
+    """
+
+    def __init__(self, device):
+        self.device = device
+        self.attached = True
+        self.key_images = {}
+        self.key_colors = {}
+        self.screen_image = None
+        self._callback = None
+        self._lock = threading.RLock()
+
+    def __getattr__(self, name):
+        return getattr(self.device, name)
+
+    def __enter__(self):
+        self.device.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return self.device.__exit__(exc_type, exc_value, traceback)
+
+    def connected(self):
+        return self.attached and self.device.connected()
+
+    def set_key_callback(self, callback):
+        self._callback = callback
+        self.device.set_key_callback(self._dispatch)
+
+    def _dispatch(self, device, key, state):
+        if self._callback:
+            self._callback(self, key, state)
+
+    def set_key_image(self, key, image):
+        with self._lock:
+            self.key_images[key] = image
+            self.key_colors.pop(key, None)
+            self._write(self.device.set_key_image, key, image)
+
+    def set_key_color(self, key, r, g, b):
+        with self._lock:
+            self.key_colors[key] = (r, g, b)
+            self.key_images.pop(key, None)
+            self._write(self.device.set_key_color, key, r, g, b)
+
+    def set_screen_image(self, image):
+        with self._lock:
+            self.screen_image = image
+            self._write(self.device.set_screen_image, image)
+
+    def reset(self):
+        with self._lock:
+            self.key_images.clear()
+            self.key_colors.clear()
+            self.screen_image = None
+            self._write(self.device.reset)
+
+    def _write(self, method, *args):
+        if not self.attached:
+            return
+        try:
+            method(*args)
+        except (IOError, TransportError) as e:
+            self.attached = False
+            logging.warning(f"Lost Stream Deck: {e}")
+
+    def detach(self):
+        """Forget the current device after it was unplugged."""
+        with self._lock:
+            self.attached = False
+            try:
+                self.device.close()
+            except (IOError, TransportError):
+                pass
+
+    def attach(self, device):
+        """Switch to a newly opened device and restore the framebuffer onto it."""
+        with self._lock:
+            self.device = device
+            if self._callback:
+                device.set_key_callback(self._dispatch)
+            for key, image in self.key_images.items():
+                device.set_key_image(key, image)
+            for key, color in self.key_colors.items():
+                device.set_key_color(key, *color)
+            if self.screen_image is not None:
+                device.set_screen_image(self.screen_image)
+            self.attached = True
+
+
 if __name__ == "__main__":
     deck = initialize_streamdeck()
     if deck:
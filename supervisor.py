@@ -0,0 +1,133 @@
+# --- supervisor.py ---
+
+import sys
+import time
+import logging
+import threading
+import backends
+import midi
+from realtime import show_mode
+from streamdeck import open_streamdeck
+
+try:
+    import pyudev
+except ImportError:
+    pyudev = None
+
+POLL_INTERVAL = 0.2  # Seconds between device checks when no udev event arrives
+
+
+class DeviceSupervisor:
+    """
+    Watches for the Stream Deck and MIDI ports going away and coming back.
+
+    On Linux with pyudev installed, USB/sound/hidraw events trigger an immediate
+    check; otherwise (and as a safety net) devices are polled every POLL_INTERVAL.
+    A returning deck is re-opened and restored from the DeckHandle framebuffer;
+    changed MIDI inputs make the forwarding loop reopen its ports, and a
+    returning output port is reopened for the router, controller and clock.
+    """
+
+    def __init__(self, controller, deck, poll_interval=POLL_INTERVAL, router=None):
+        """
+        Args:
+            controller: The Controller, whose output port is replaced on reconnect.
+            deck (DeckHandle): The deck handle shared by the rest of LiveDeck.
+            poll_interval (float): Seconds between checks.
+            router: A MidiRouterProcess when MIDI is routed out of process; the midi module otherwise.
+        """
+        self.controller = controller
+        self.deck = deck
+        self.router = router or midi
+        self.poll_interval = poll_interval
+        self.backend = backends.current()
+        self._inputs = set(self.backend.get_input_names())
+        self._output_present = midi.midi_output_name in self.backend.get_output_names()
+        self._deck_lost_at = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._observer = None
+
+    def start(self):
+        """Starts the supervisor thread and, where available, the udev monitor."""
+        if self._thread is not None:
+            return
+        self._start_udev_monitor()
+        self._thread = threading.Thread(target=self._run, name="device-supervisor", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._observer is not None:
+            self._observer.stop()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+            self._thread = None
+
+    def _start_udev_monitor(self):
+        if pyudev is None or not sys.platform.startswith("linux") or self.backend.name != "hardware":
+            logging.info("Polling for device changes every %.1fs", self.poll_interval)
+            return
+        try:
+            monitor = pyudev.Monitor.from_netlink(pyudev.Context())
+            for subsystem in ("usb", "hidraw", "sound"):
+                monitor.filter_by(subsystem)
+            self._observer = pyudev.MonitorObserver(monitor, callback=lambda device: self._wake.set(),
+                                                    name="udev-monitor")
+            self._observer.daemon = True
+            self._observer.start()
+            logging.info("Watching udev for device changes")
+        except Exception as e:
+            logging.warning("udev monitoring unavailable, polling instead: %s", e)
+
+    def _run(self):
+        while not self._stop.is_set():
+            if self._wake.wait(self.poll_interval):
+                self._wake.clear()
+            try:
+                self.check()
+            except Exception as e:
+                logging.error("Device check failed: %s", e)
+
+    def check(self):
+        """Checks every device once and reconnects whatever came back."""
+        self._check_deck()
+        self._check_midi()
+
+    def _check_deck(self):
+        if self.deck.connected():
+            return
+        if self._deck_lost_at is None:
+            self._deck_lost_at = time.monotonic()
+            logging.warning("Stream Deck disconnected; waiting for it to return")
+            self.deck.detach()
+        device = open_streamdeck(warn_missing=False)
+        if device is None:
+            return
+        try:
+            self.deck.attach(device)
+        except Exception:
+            # attach() swapped the new device in before failing; close it so its
+            # handle and reader thread don't leak, and retry on the next check
+            self.deck.detach()
+            raise
+        show_mode.adopt(getattr(device, "read_thread", None))
+        logging.info("Stream Deck restored %.2fs after it was lost", time.monotonic() - self._deck_lost_at)
+        self._deck_lost_at = None
+
+    def _check_midi(self):
+        inputs = set(self.backend.get_input_names())
+        if inputs != self._inputs:
+            logging.info("MIDI inputs changed: %s", sorted(inputs))
+            self._inputs = inputs
+            self.router.notify_ports_changed()
+
+        output_present = midi.midi_output_name in self.backend.get_output_names()
+        if output_present and not self._output_present:
+            self.router.reopen_output()
+            self.controller.reopen_outport(self.backend.open_output(midi.midi_output_name))
+        elif not output_present and self._output_present:
+            logging.warning("MIDI output %s disappeared", midi.midi_output_name)
+        self._output_present = output_present
@@ -1,10 +1,15 @@
 # --- utils.py ---
 
+import io
 import os
+import math
+import logging
 from PIL import Image, ImageDraw, ImageFont
 from StreamDeck.ImageHelpers import PILHelper
 from config import FONT_PATH
 
+PRESSED_COLOR = (0, 120, 255)  # Highlight on a key whose press is being applied
+
 def ensure_file_exists(filepath, default_content=""):
     """
     Ensures a file exists. If not, creates it with default content.
@@ -18,6 +23,23 @@ def ensure_file_exists(filepath, default_content=""):
             file.write(default_content)
         print(f"Created missing file: {filepath}")
 
+def load_font(font_path, size):
+    """
+    Loads a TrueType font, falling back to Pillow's built-in font if it is missing.
+
+    Args:
+        font_path (str): Path to the font file.
+        size (int): Font size in pixels.
+
+    Returns:
+        ImageFont: The loaded font.
+    """
+    try:
+        return ImageFont.truetype(font_path, size)
+    except OSError:
+        logging.warning("Font not found: %s, using default font.", font_path)
+        return ImageFont.load_default(size)
+
 def render_button(deck, label, image_path):
     """
     Generates a button image with album art and a text label.
@@ -39,12 +61,70 @@ def render_button(deck, label, image_path):
     image = PILHelper.create_scaled_key_image(deck, icon)
 
     draw = ImageDraw.Draw(image)
-    font = ImageFont.truetype(FONT_PATH, 14)
+    font = load_font(FONT_PATH, 14)
 
     draw.text((image.width / 2, image.height - 10), label, font=font, anchor="ms", fill="white")
 
     return PILHelper.to_native_key_format(deck, image)
 
+def compose_song_key(deck, icon, title, font):
+    """
+    Composes a song key: album art scaled to the key with the title on a black strip.
+
+    Args:
+        deck: Stream Deck device (or anything with its key_image_format()).
+        icon (Image): Album art.
+        title (str): Song title.
+        font (ImageFont): Font for the title.
+
+    Returns:
+        Image: Key-sized PIL image.
+    """
+    image = PILHelper.create_scaled_key_image(deck, icon)
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((0, image.height - 32, image.width, image.height), fill=(0, 0, 0))
+    draw.text((image.width / 2, image.height - 10), title, font=font, anchor="ms", fill="white")
+    return image
+
+def render_song_key(deck, icon, title, font):
+    """
+    Renders a song key (see compose_song_key) in the deck's native key format.
+
+    Returns:
+        bytes: Image in the deck's native key format.
+    """
+    return PILHelper.to_native_key_format(deck, compose_song_key(deck, icon, title, font))
+
+def render_pressed_key(deck, image, color=PRESSED_COLOR):
+    """
+    Draws the press highlight around a composed key image and converts it to the
+    deck's native key format.
+
+    Returns:
+        bytes: Image in the deck's native key format.
+    """
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((0, 0, image.width - 1, image.height - 1), outline=color, width=4)
+    return PILHelper.to_native_key_format(deck, image)
+
+def decode_native_key(deck, native_img):
+    """
+    Decodes a key image in the deck's native format back into an upright PIL
+    image, undoing the flip and rotation applied by PILHelper.to_native_key_format.
+
+    Returns:
+        Image: Key-sized RGB image.
+    """
+    key_format = deck.key_image_format()
+    image = Image.open(io.BytesIO(native_img)).convert("RGB")
+    if key_format["flip"][1]:
+        image = image.transpose(Image.FLIP_TOP_BOTTOM)
+    if key_format["flip"][0]:
+        image = image.transpose(Image.FLIP_LEFT_RIGHT)
+    if key_format["rotation"]:
+        image = image.rotate(-key_format["rotation"])
+    return image
+
 def log(message):
     """
     Simple logging function.
@@ -60,4 +140,21 @@ def get_artwork_path(filename):
 
 def ensure_artwork_dir():
     """Helper function to ensure artwork directory exists"""
-    os.makedirs('assets/artwork', exist_ok=True)
\ No newline at end of file
+    os.makedirs('assets/artwork', exist_ok=True)
+
+def percentile(values, pct):
+    """
+    Returns the pct-th percentile of a list of numbers (nearest-rank).
+
+    Args:
+        values (list): Samples to summarise.
+        pct (float): Percentile between 0 and 100.
+
+    Returns:
+        float: The percentile value, or 0.0 if there are no samples.
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100.0 * len(ordered)) - 1))
+    return ordered[rank]